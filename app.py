@@ -1,12 +1,20 @@
-from flask import Flask, render_template, redirect, url_for, flash, request, jsonify, make_response
-from werkzeug.utils import secure_filename
+from flask import Flask, render_template, redirect, url_for, flash, request, jsonify, make_response, abort, Response, stream_with_context, send_file
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_bcrypt import Bcrypt
-from textblob import TextBlob
+from sqlalchemy import event, tuple_, case, bindparam, inspect
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime, timedelta
-import os, json, math, random
-from PIL import Image
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from werkzeug.utils import secure_filename
+import os, io, json, math, random, threading, time, queue, bisect, hashlib, zipfile, atexit
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from sentiment import sentiment_service
+from portfolio import render_portfolio, fingerprint as portfolio_fingerprint
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your_secret_key_here'
@@ -15,7 +23,76 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'static/club_logos'
 app.config['PROFILE_PICS_FOLDER'] = 'static/profile_pics'
 
+# ─────────────────────────────────────────────
+#  SQLITE PROFILE – pragmas & pool per connection
+# ─────────────────────────────────────────────
+# SQLITE_PROFILE=production (default) or default for SQLite's stock settings;
+# SQLITE_POOL_SIZE overrides the profile's pool size.
+SQLITE_PROFILES = {
+    'default': {
+        'pragmas': {},
+        'pool': {},
+    },
+    'production': {
+        # WAL: readers no longer block the writer (or vice versa); NORMAL sync is
+        # durable across app crashes and only fsyncs at checkpoints
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'mmap_size': 256 * 1024 * 1024,  # shared through the OS page cache, not per connection
+            'temp_store': 'MEMORY',
+        },
+        'busy_timeout': 5,                  # s to wait for the write lock instead of "database is locked"
+        'cache_kib': 64000,                 # page cache for the whole pool, split across its connections
+        # SQLite has a single writer; more connections only queue on the lock
+        'pool': {'pool_size': 5, 'max_overflow': 5, 'pool_timeout': 30},
+    },
+}
+
+
+def sqlite_pool_options(profile):
+    """The profile's pool settings, with the SQLITE_POOL_SIZE override applied."""
+    options = dict(SQLITE_PROFILES[profile]['pool'])
+    if os.environ.get('SQLITE_POOL_SIZE'):
+        options['pool_size'] = int(os.environ['SQLITE_POOL_SIZE'])
+    return options
+
+
+def sqlite_engine_options(profile):
+    """SQLALCHEMY_ENGINE_OPTIONS for a profile (pool sizing, busy timeout at connect)."""
+    options = sqlite_pool_options(profile)
+    busy_timeout = SQLITE_PROFILES[profile].get('busy_timeout')
+    if busy_timeout is not None:
+        options['connect_args'] = {'timeout': busy_timeout}
+    return options
+
+
+def apply_sqlite_profile(engine, profile):
+    """Run the profile's PRAGMAs on every new DB-API connection of `engine`."""
+    settings = SQLITE_PROFILES[profile]
+    pragmas = dict(settings['pragmas'])
+    if settings.get('cache_kib'):
+        # cache_size is per connection, so a full pool stays within the budget
+        pool = sqlite_pool_options(profile)
+        connections = pool.get('pool_size', 5) + pool.get('max_overflow', 10)
+        pragmas['cache_size'] = -(settings['cache_kib'] // connections)
+    if not pragmas or engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'production')
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlite_engine_options(SQLITE_PROFILE)
+
 db = SQLAlchemy(app)
+with app.app_context():
+    apply_sqlite_profile(db.engine, SQLITE_PROFILE)
 bcrypt = Bcrypt(app)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
@@ -35,6 +112,16 @@ BADGE_DEFINITIONS = {
     'Feedback Guru':       {'icon': '📝', 'desc': 'Submitted 5+ feedbacks',             'rarity': 'uncommon',  'xp': 25},
     'Explorer':            {'icon': '🧭', 'desc': 'Visited 10+ clubs',                  'rarity': 'uncommon',  'xp': 20},
 }
+# Badges awarded automatically: badge -> (activity counter, threshold).
+# Anything in BADGE_DEFINITIONS without a rule is awarded by hand.
+BADGE_RULES = {
+    'First Club Joined':   ('clubs_joined', 1),
+    'Club Leader':         ('clubs_created', 1),
+    'Streak 7':            ('streak', 7),
+    'Social Butterfly':    ('events_registered', 5),
+    'Newbie':              ('events_registered', 1),
+    'Feedback Guru':       ('feedback_submitted', 5),
+}
 ITEM_RARITY_HIERARCHY = {
     'legendary': 5,
     'epic': 4,
@@ -49,6 +136,21 @@ LEVEL_NAMES = [
     'Champion', 'Mentor', 'Visionary', 'Elite', 'Campus Legend', 'Mythic'
 ]
 
+def badge_sort_key(badge_name):
+    # 1. "Club Leader" is highest priority
+    if badge_name == 'Club Leader':
+        return (1, 0, 0)
+
+    # 2. Rarity hierarchy
+    badge_info = BADGE_DEFINITIONS.get(badge_name)
+    if not badge_info:
+        return (0, 0, 0)
+
+    rarity_score = ITEM_RARITY_HIERARCHY.get(badge_info.get('rarity', 'common'), 0)
+    xp_score = badge_info.get('xp', 0)
+
+    return (0, rarity_score, xp_score)
+
 def get_level_info(xp):
     """Return (level_number, level_name, xp_in_level, xp_for_next_level, progress_pct)"""
     level = 0
@@ -88,7 +190,7 @@ class User(db.Model, UserMixin):
     hobbies = db.Column(db.Text, nullable=True)
     points = db.Column(db.Integer, default=0)       # legacy
     xp = db.Column(db.Integer, default=0)
-    badges = db.Column(db.Text, default="")
+    badges = db.Column(db.Text, default="")         # legacy CSV mirror of badge_rows
 
     streak_count = db.Column(db.Integer, default=0)
     last_active = db.Column(db.DateTime, default=datetime.utcnow)
@@ -96,109 +198,181 @@ class User(db.Model, UserMixin):
     is_admin = db.Column(db.Boolean, default=False)
     clubs_managed = db.relationship('Club', backref='manager', lazy=True)
     registrations = db.relationship('EventRegistration', backref='user', lazy=True)
-    profile_image = db.Column(db.String(20), nullable=False, default='default.jpg')
+    profile_image = db.Column(db.String(40), nullable=False, default='default.jpg')
     skills = db.relationship('UserSkill', backref='user', lazy=True)
+    badge_rows = db.relationship('UserBadge', backref='user', lazy=True, cascade='all, delete-orphan',
+                                 order_by='UserBadge.awarded_at')
 
     @property
     def level_info(self):
         return get_level_info(self.xp)
 
+    # Badge names are cached on the instance, which lives for one request/session;
+    # preload_badges() fills the cache for a whole list of users in one query.
     @property
     def badge_list(self):
-        if not self.badges:
-            return []
-        return [b.strip() for b in self.badges.split(',') if b.strip()]
+        names = self.__dict__.get('_badge_names')
+        if names is None:
+            names = self._badge_names = [b.badge_name for b in self.badge_rows]
+        return names
 
     @property
-    def top_badges(self):
-        badges = self.badge_list
-        if not badges:
-            return []
-            
-        def badge_sort_key(badge_name):
-            # 1. "Club Leader" is highest priority
-            if badge_name == 'Club Leader':
-                return (1, 0, 0)
-            
-            # 2. Rarity hierarchy
-            badge_info = BADGE_DEFINITIONS.get(badge_name)
-            if not badge_info:
-                return (0, 0, 0)
-                
-            rarity_score = ITEM_RARITY_HIERARCHY.get(badge_info.get('rarity', 'common'), 0)
-            xp_score = badge_info.get('xp', 0)
-            
-            return (0, rarity_score, xp_score)
-            
-        # Reverse=True to get highest priority first
-        sorted_badges = sorted(badges, key=badge_sort_key, reverse=True)
-        return sorted_badges[:3]
+    def badge_set(self):
+        names = self.__dict__.get('_badge_name_set')
+        if names is None:
+            names = self._badge_name_set = frozenset(self.badge_list)
+        return names
+
+    def has_badge(self, badge_name):
+        return badge_name in self.badge_set
 
-    def add_xp(self, amount):
+    @property
+    def top_badges(self):
+        top = self.__dict__.get('_top_badges')
+        if top is None:
+            # Reverse=True to get highest priority first
+            top = self._top_badges = sorted(self.badge_list, key=badge_sort_key, reverse=True)[:3]
+        return top
+
+    def _clear_badge_cache(self):
+        for key in ('_badge_names', '_badge_name_set', '_top_badges'):
+            self.__dict__.pop(key, None)
+
+    def set_badges(self, badge_names):
+        """Replace the user's badges outright, without awarding XP (seed/admin scripts)."""
+        names = list(dict.fromkeys(n.strip() for n in badge_names if n and n.strip()))
+        existing = {b.badge_name: b for b in self.badge_rows}
+        self.badge_rows = [existing.get(n) or UserBadge(badge_name=n) for n in names]
+        self.badges = ''.join(n + ',' for n in names)
+        self._clear_badge_cache()
+
+    def add_xp(self, amount, source='activity'):
         old_level = self.level_info['level']
         self.xp += amount
         self.points += amount
+        db.session.add(XPEvent(user=self, amount=amount, source=source))
         new_level = self.level_info['level']
         return new_level > old_level  # True if leveled up
 
     def add_badge(self, badge_name):
-        if badge_name not in self.badge_list:
+        if not self.has_badge(badge_name):
+            self.badge_rows.append(UserBadge(badge_name=badge_name))
             self.badges = (self.badges or "") + badge_name + ","
+            self._clear_badge_cache()
             if badge_name in BADGE_DEFINITIONS:
-                self.add_xp(BADGE_DEFINITIONS[badge_name]['xp'])
+                self.add_xp(BADGE_DEFINITIONS[badge_name]['xp'], source=f'badge:{badge_name}')
             return True
         return False
 
     def update_streak(self):
-        now = datetime.utcnow()
-        if self.last_active:
-            diff = (now.date() - self.last_active.date()).days
-            if diff == 1:
-                self.streak_count += 1
-            elif diff > 1:
-                self.streak_count = 1
-            # same day = no change
-        else:
-            self.streak_count = 1
-        self.last_active = now
-        
-        if self.streak_count >= 7:
-            self.add_badge('Streak 7')
+        """Mark the user active now (see StreakTracker: one row write per day, last_active batched)."""
+        streak_tracker.touch(self)
 
     def get_skill_stats(self):
-        skill_counts = {}
-        # Include manually added skills
-        for us in UserSkill.query.filter_by(user_id=self.id).all():
-            skill_counts[us.skill.name] = skill_counts.get(us.skill.name, 0) + us.amount
-        # Include skills from clubs
-        for uc in self.clubs_joined:
-            if uc.status == 'approved':
-                for cs in uc.club.skills:
-                    skill_counts[cs.skill.name] = skill_counts.get(cs.skill.name, 0) + cs.points
-        # Include skills from events
-        for reg in self.registrations:
-            if reg.event.event_date < datetime.utcnow(): 
-                for cs in reg.event.club.skills:
-                    skill_counts[cs.skill.name] = skill_counts.get(cs.skill.name, 0) + int(cs.points * 0.5)
-        return skill_counts
+        # Read from the materialized UserSkillVector rows (manual skills + approved
+        # clubs + half points for past events), cached on the instance for the request
+        stats = self.__dict__.get('_skill_stats')
+        if stats is None:
+            stats = self._skill_stats = dict(
+                db.session.query(Skill.name, UserSkillVector.points)
+                .join(Skill, Skill.id == UserSkillVector.skill_id)
+                .filter(UserSkillVector.user_id == self.id))
+        return stats
 
     def get_career_alignment(self):
         user_skills = self.get_skill_stats()
-        careers = Career.query.all()
         alignment = []
-        for career in careers:
-            required = json.loads(career.required_skills)
-            if not required: continue
-            matched = 0
-            possible = len(required) * 50
-            for req in required:
-                matched += min(user_skills.get(req, 0), 50)
-            pct = int((matched / possible) * 100) if possible > 0 else 0
-            alignment.append({'name': career.name, 'match': pct, 'missing': [s for s in required if s not in user_skills or user_skills[s] < 10]})
+        for name, required in career_requirements():
+            matched = sum(min(user_skills.get(req, 0), 50) for req in required)
+            pct = int((matched / (len(required) * 50)) * 100)
+            alignment.append({'name': name, 'match': pct, 'missing': [s for s in required if user_skills.get(s, 0) < 10]})
         alignment.sort(key=lambda x: x['match'], reverse=True)
         return alignment
 
 
+class UserBadge(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    badge_name = db.Column(db.String(50), nullable=False)
+    awarded_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('uq_user_badge_user_badge', 'user_id', 'badge_name', unique=True),
+        db.Index('ix_user_badge_badge_name', 'badge_name'),
+        db.Index('ix_user_badge_awarded_at', 'awarded_at'),
+    )
+
+
+class UserSkillVector(db.Model):
+    """Materialized skill points per user; maintained by rebuild_skill_vectors."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    skill_id = db.Column(db.Integer, db.ForeignKey('skill.id'), nullable=False)
+    points = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('uq_user_skill_vector_user_skill', 'user_id', 'skill_id', unique=True),
+    )
+
+
+class UserCounter(db.Model):
+    """Lifetime per-user activity tallies (clubs joined, events registered, ...) behind BADGE_RULES."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    name = db.Column(db.String(40), nullable=False)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('uq_user_counter_user_name', 'user_id', 'name', unique=True),
+    )
+
+
+class XPEvent(db.Model):
+    """Append-only ledger of XP awards, written by User.add_xp."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    amount = db.Column(db.Integer, nullable=False)
+    source = db.Column(db.String(50), nullable=False, default='activity')  # e.g. "event_registration", "badge:Newbie"
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    user = db.relationship('User', backref=db.backref('xp_events', lazy='dynamic'))
+
+    __table_args__ = (
+        db.Index('ix_xp_event_user_created', 'user_id', 'created_at'),
+    )
+
+
+class XPDailyTotal(db.Model):
+    """XP earned per user per UTC day, rolled up from XPEvent as rows are flushed."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    xp = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('uq_xp_daily_total_user_day', 'user_id', 'day', unique=True),
+        db.Index('ix_xp_daily_total_day', 'day'),
+    )
+
+
+class UserActivityDay(db.Model):
+    """Per-user, per-UTC-day activity counts behind the profile heatmap, rolled up as rows are flushed."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    registrations = db.Column(db.Integer, nullable=False, default=0)
+    joins = db.Column(db.Integer, nullable=False, default=0)
+    feedback = db.Column(db.Integer, nullable=False, default=0)
+    messages = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('uq_user_activity_day_user_day', 'user_id', 'day', unique=True),
+    )
+
+    @property
+    def total(self):
+        return self.registrations + self.joins + self.feedback + self.messages
+
+
 class Skill(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), unique=True, nullable=False)
@@ -231,7 +405,7 @@ class Club(db.Model):
     name = db.Column(db.String(100), unique=True, nullable=False)
     description = db.Column(db.Text, nullable=False)
     category = db.Column(db.String(50), nullable=True, default='General')
-    image_file = db.Column(db.String(20), nullable=False, default='default.svg')
+    image_file = db.Column(db.String(40), nullable=False, default='default.svg')
     manager_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     popularity_score = db.Column(db.Integer, default=0)
     members = db.relationship('UserClub', backref='club', lazy=True)
@@ -241,6 +415,8 @@ class Club(db.Model):
 
     @property
     def member_count(self):
+        if '_member_count' in self.__dict__:
+            return self._member_count
         return UserClub.query.filter_by(club_id=self.id, status='approved').count()
 
 
@@ -250,14 +426,31 @@ class UserClub(db.Model):
     club_id = db.Column(db.Integer, db.ForeignKey('club.id'), nullable=False)
     status = db.Column(db.String(20), default='pending')
     
+    __table_args__ = (
+        db.Index('uq_user_club_user_club', 'user_id', 'club_id', unique=True),
+        db.Index('ix_user_club_club_status', 'club_id', 'status'),
+    )
+
     user_rel = db.relationship('User', backref=db.backref('clubs_joined', lazy=True))
 
 
+class ClubSimilarity(db.Model):
+    """Top-K item-item neighbours per club; written by rebuild_club_similarity."""
+    id = db.Column(db.Integer, primary_key=True)
+    club_id = db.Column(db.Integer, db.ForeignKey('club.id'), nullable=False)
+    similar_club_id = db.Column(db.Integer, db.ForeignKey('club.id'), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (
+        db.Index('uq_club_similarity_pair', 'club_id', 'similar_club_id', unique=True),
+    )
+
+
 class Event(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     date_posted = db.Column(db.DateTime, nullable=False, default=db.func.current_timestamp())
-    event_date = db.Column(db.DateTime, nullable=False)
+    event_date = db.Column(db.DateTime, nullable=False, index=True)
     description = db.Column(db.Text, nullable=False)
     club_id = db.Column(db.Integer, db.ForeignKey('club.id'), nullable=False)
     difficulty = db.Column(db.String(20), default='Beginner')  # Beginner / Intermediate / Advanced
@@ -271,6 +464,8 @@ class Event(db.Model):
 
     @property
     def attendee_count(self):
+        if '_attendee_count' in self.__dict__:
+            return self._attendee_count
         return EventRegistration.query.filter_by(event_id=self.id).count()
     
     @property
@@ -291,6 +486,9 @@ class Event(db.Model):
     def is_user_registered(self, user):
         if not user or not user.is_authenticated:
             return False
+        preloaded = self.__dict__.get('_registered_for')
+        if preloaded and preloaded[0] == user.id:
+            return preloaded[1]
         return EventRegistration.query.filter_by(user_id=user.id, event_id=self.id).first() is not None
 
 
@@ -301,6 +499,11 @@ class EventRegistration(db.Model):
     transaction_id = db.Column(db.String(100), nullable=True)
     registered_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('uq_event_registration_user_event', 'user_id', 'event_id', unique=True),
+        db.Index('ix_event_registration_event_id', 'event_id'),
+    )
+
 
 class Feedback(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -308,8 +511,14 @@ class Feedback(db.Model):
     sentiment_score = db.Column(db.Float, nullable=False)
     sentiment_label = db.Column(db.String(20), nullable=False)
     club_id = db.Column(db.Integer, db.ForeignKey('club.id'), nullable=False)
-    user_id = db.Column(db.Integer, nullable=True)
+    user_id = db.Column(db.Integer, nullable=True, index=True)
     timestamp = db.Column(db.DateTime, nullable=False, default=db.func.current_timestamp())
+    claimed_at = db.Column(db.DateTime, nullable=True)   # set while a SentimentWorker scores the row
+
+    __table_args__ = (
+        db.Index('ix_feedback_club_id', 'club_id'),
+        db.Index('ix_feedback_club_timestamp', 'club_id', 'timestamp'),
+    )
 
 
 class Message(db.Model):
@@ -322,11 +531,1981 @@ class Message(db.Model):
     user = db.relationship('User', backref='chat_messages', lazy=True)
     club = db.relationship('Club', backref='chat_messages', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_message_club_timestamp', 'club_id', 'timestamp'),
+        db.Index('ix_message_club_id', 'club_id', 'id'),
+        db.Index('ix_message_club_pinned', 'club_id', 'is_pinned'),
+    )
+
+
+class ClubStats(db.Model):
+    """Per-club dashboard rollup; counts are kept incrementally, the 30-day
+    trend windows are recomputed lazily once `trend_day` is stale."""
+    club_id = db.Column(db.Integer, db.ForeignKey('club.id'), primary_key=True)
+    members = db.Column(db.Integer, nullable=False, default=0)
+    events = db.Column(db.Integer, nullable=False, default=0)
+    feedback = db.Column(db.Integer, nullable=False, default=0)
+    positive = db.Column(db.Integer, nullable=False, default=0)
+    negative = db.Column(db.Integer, nullable=False, default=0)
+    neutral = db.Column(db.Integer, nullable=False, default=0)
+    pending = db.Column(db.Integer, nullable=False, default=0)
+    sentiment_sum = db.Column(db.Float, nullable=False, default=0.0)
+    recent_count = db.Column(db.Integer, nullable=False, default=0)    # scored feedback, last 30 days
+    recent_sum = db.Column(db.Float, nullable=False, default=0.0)
+    prior_count = db.Column(db.Integer, nullable=False, default=0)     # the 30 days before that
+    prior_sum = db.Column(db.Float, nullable=False, default=0.0)
+    trend_day = db.Column(db.Date, nullable=True)
+
+    @property
+    def mean_sentiment(self):
+        scored = self.positive + self.negative + self.neutral
+        return self.sentiment_sum / scored if scored else None
+
+    @property
+    def trend(self):
+        """Mean sentiment of the last 30 days minus the 30 days before (None without data)."""
+        if not self.recent_count or not self.prior_count:
+            return None
+        return self.recent_sum / self.recent_count - self.prior_sum / self.prior_count
+
+
+class SentimentBucket(db.Model):
+    """Scored feedback per club per day or (once compacted) per week.
+
+    A week is covered either by day buckets or by one week bucket, never both.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    club_id = db.Column(db.Integer, db.ForeignKey('club.id'), nullable=False)
+    granularity = db.Column(db.String(4), nullable=False)   # 'day' | 'week'
+    start = db.Column(db.Date, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    score_min = db.Column(db.Float, nullable=False)
+    score_max = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (
+        db.Index('uq_sentiment_bucket_club_start', 'club_id', 'granularity', 'start', unique=True),
+    )
+
+
+# ─────────────────────────────────────────────
+#  BADGE RULES ENGINE – award badges as activity is recorded
+# ─────────────────────────────────────────────
+RULES_BY_COUNTER = {}
+for _badge, (_counter, _threshold) in BADGE_RULES.items():
+    assert _badge in BADGE_DEFINITIONS, _badge
+    RULES_BY_COUNTER.setdefault(_counter, []).append((_badge, _threshold))
+
+
+def check_badges(user, counter, value):
+    """Award the badges whose rule on `counter` is met by `value`; returns the new ones."""
+    return [badge for badge, threshold in RULES_BY_COUNTER.get(counter, ())
+            if value >= threshold and user.add_badge(badge)]
+
+
+def record_activity(user, counter, delta=1):
+    """Bump one of `user`'s counters and evaluate only the rules that depend on it."""
+    table = UserCounter.__table__
+    stmt = sqlite_insert(table).values(user_id=user.id, name=counter, value=delta)
+    stmt = stmt.on_conflict_do_update(index_elements=['user_id', 'name'],
+                                      set_={'value': table.c.value + stmt.excluded.value})
+    db.session.execute(stmt)
+    value = db.session.query(UserCounter.value).filter_by(user_id=user.id, name=counter).scalar()
+    return check_badges(user, counter, value)
+
+
+def rebuild_badge_counters():
+    """Recompute every user's counters from existing rows and award anything now earned.
+
+    Run once after upgrading (see backfill_badges.py); day to day the counters
+    are maintained by record_activity.
+    """
+    count = db.func.count()
+    sources = {
+        'clubs_joined': db.session.query(UserClub.user_id, count)
+                                  .filter(UserClub.status == 'approved').group_by(UserClub.user_id),
+        'clubs_created': db.session.query(Club.manager_id, count).group_by(Club.manager_id),
+        'events_registered': db.session.query(EventRegistration.user_id, count).group_by(EventRegistration.user_id),
+        'feedback_submitted': db.session.query(Feedback.user_id, count)
+                                        .filter(Feedback.user_id.isnot(None)).group_by(Feedback.user_id),
+    }
+    UserCounter.query.delete()
+    values = {}
+    for counter, query in sources.items():
+        for user_id, n in query:
+            db.session.add(UserCounter(user_id=user_id, name=counter, value=n))
+            values.setdefault(user_id, {})[counter] = n
+    awarded = 0
+    for user in User.query.all():
+        user_values = dict(values.get(user.id, {}), streak=user.streak_count or 0)
+        for counter, value in user_values.items():
+            awarded += len(check_badges(user, counter, value))
+    db.session.commit()
+    return awarded
+
+
+# ─────────────────────────────────────────────
+#  STREAK TRACKER – coalesced streak/last_active writes
+# ─────────────────────────────────────────────
+class StreakTracker:
+    """Keeps streak_count/last_active current without writing the user row on
+    every request.
+
+    A user's first activity of the day (per process) applies the streak
+    transition right away, inside the request's transaction: one UPDATE whose
+    CASE works against the stored row (next day +1, a gap resets to 1, same
+    day unchanged). Repeating it, or another process doing the same, is a
+    no-op, and the Streak 7 badge is checked in the same transaction. Once that
+    commits, the day is "seen". Later activity that day only moves last_active:
+    the latest timestamp per user is kept in memory and written every
+    `interval` seconds with one batched UPDATE.
+    """
+
+    def __init__(self, interval=30):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._seen = set()       # (user_id, day) whose transition is committed
+        self._pending = {}       # user_id -> latest activity not yet written
+        self._started = False
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._run, name='streak-flush', daemon=True).start()
+        atexit.register(self.flush)
+
+    def touch(self, user, now=None):
+        now = now or datetime.utcnow()
+        key = (user.id, now.date())
+        with self._lock:
+            if key in self._seen:
+                self._pending[user.id] = max(now, self._pending.get(user.id, now))
+                return
+        self._advance(user, now)
+        on_commit(db.session, lambda: self._mark_seen(key, now))
+        self.start()
+
+    def _advance(self, user, now):
+        """Apply today's streak transition to the stored row (caller's transaction)."""
+        table = User.__table__
+        last_day = db.func.date(table.c.last_active)
+        prev = (now.date() - timedelta(days=1)).isoformat()
+        db.session.execute(table.update().where(table.c.id == user.id).values(
+            streak_count=case((table.c.last_active.is_(None), 1),
+                              (last_day == prev, db.func.coalesce(table.c.streak_count, 0) + 1),
+                              (last_day < prev, 1),
+                              else_=table.c.streak_count),
+            last_active=case((table.c.last_active.is_(None), now),
+                             (table.c.last_active < now, now),
+                             else_=table.c.last_active)))
+        streak, last_active = db.session.query(User.streak_count, User.last_active).filter(User.id == user.id).one()
+        set_committed_value(user, 'streak_count', streak)
+        set_committed_value(user, 'last_active', last_active)
+        check_badges(user, 'streak', streak)
+
+    def _mark_seen(self, key, now):
+        with self._lock:
+            self._seen.add(key)
+            self._pending[key[0]] = max(now, self._pending.get(key[0], now))
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+    def flush(self):
+        """Write the queued last_active timestamps; returns the number of users updated."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            today = datetime.utcnow().date()
+            self._seen = {key for key in self._seen if key[1] >= today}
+        if not pending:
+            return 0
+        table = User.__table__
+        ts = bindparam('ts', type_=db.DateTime)
+        stmt = (table.update()
+                .where(table.c.id == bindparam('uid'), db.or_(table.c.last_active.is_(None), table.c.last_active < ts))
+                .values(last_active=ts))
+        with app.app_context():
+            try:
+                db.session.execute(stmt, [{'uid': user_id, 'ts': ts} for user_id, ts in pending.items()])
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                app.logger.exception('last_active flush failed for %d users', len(pending))
+                with self._lock:
+                    for user_id, ts in pending.items():
+                        self._pending[user_id] = max(ts, self._pending.get(user_id, ts))
+                return 0
+            finally:
+                db.session.remove()
+        return len(pending)
+
+
+streak_tracker = StreakTracker()
+
+
+# ─────────────────────────────────────────────
+#  BATCH LOADERS – fill per-row properties in a fixed number of queries
+# ─────────────────────────────────────────────
+def preload_club_stats(clubs):
+    """Attach approved member counts so `Club.member_count` skips its query."""
+    ids = [c.id for c in clubs]
+    if not ids:
+        return clubs
+    counts = dict(db.session.query(UserClub.club_id, db.func.count(UserClub.id))
+                  .filter(UserClub.club_id.in_(ids), UserClub.status == 'approved')
+                  .group_by(UserClub.club_id).all())
+    for club in clubs:
+        club._member_count = counts.get(club.id, 0)
+    return clubs
+
+
+def preload_badges(users):
+    """Fill each user's badge cache so badge_list/top_badges skip their lazy load."""
+    ids = [u.id for u in users]
+    if not ids:
+        return users
+    names = {uid: [] for uid in ids}
+    for user_id, badge_name in (db.session.query(UserBadge.user_id, UserBadge.badge_name)
+                                .filter(UserBadge.user_id.in_(ids))
+                                .order_by(UserBadge.awarded_at, UserBadge.id)):
+        names[user_id].append(badge_name)
+    for user in users:
+        user._clear_badge_cache()
+        user._badge_names = names[user.id]
+    return users
+
+
+def preload_skill_stats(users):
+    """Fill each user's skill stats cache from UserSkillVector in one query."""
+    ids = [u.id for u in users]
+    if not ids:
+        return users
+    stats = {uid: {} for uid in ids}
+    for user_id, name, points in (db.session.query(UserSkillVector.user_id, Skill.name, UserSkillVector.points)
+                                  .join(Skill, Skill.id == UserSkillVector.skill_id)
+                                  .filter(UserSkillVector.user_id.in_(ids))):
+        stats[user_id][name] = points
+    for user in users:
+        user._skill_stats = stats[user.id]
+    return users
+
+
+def preload_event_stats(events, user=None):
+    """Attach attendee counts and `user`'s registration flag to each event."""
+    ids = [e.id for e in events]
+    if not ids:
+        return events
+    counts = dict(db.session.query(EventRegistration.event_id, db.func.count(EventRegistration.id))
+                  .filter(EventRegistration.event_id.in_(ids))
+                  .group_by(EventRegistration.event_id).all())
+    registered = None
+    if user is not None and user.is_authenticated:
+        registered = {event_id for (event_id,) in db.session.query(EventRegistration.event_id)
+                      .filter(EventRegistration.user_id == user.id, EventRegistration.event_id.in_(ids))}
+    for e in events:
+        e._attendee_count = counts.get(e.id, 0)
+        if registered is not None:
+            e._registered_for = (user.id, e.id in registered)
+    return events
+
+
+# ─────────────────────────────────────────────
+#  HOME FEED – keyset pagination over (event_date, id)
+# ─────────────────────────────────────────────
+FEED_PAGE_SIZE = 9
+CLUB_PAGE_SIZE = 12
+CURSOR_DATE_FORMAT = '%Y%m%d%H%M%S%f'
+
+
+def encode_event_cursor(event):
+    return f"{event.event_date.strftime(CURSOR_DATE_FORMAT)}.{event.id}"
+
+
+def decode_event_cursor(cursor):
+    """Return (event_date, id) or raise ValueError for a malformed cursor."""
+    date_part, id_part = cursor.split('.')
+    return datetime.strptime(date_part, CURSOR_DATE_FORMAT), int(id_part)
+
+
+def event_feed_page(stream, cursor=None, limit=FEED_PAGE_SIZE):
+    """One page of the 'upcoming' (soonest first) or 'past' (latest first) stream.
+
+    Returns (events, next_cursor); next_cursor is None on the last page.
+    """
+    now = datetime.utcnow()
+    key = tuple_(Event.event_date, Event.id)
+    query = Event.query.options(joinedload(Event.club))
+    if stream == 'upcoming':
+        query = query.filter(Event.event_date > now).order_by(Event.event_date.asc(), Event.id.asc())
+        if cursor:
+            query = query.filter(key > decode_event_cursor(cursor))
+    elif stream == 'past':
+        query = query.filter(Event.event_date <= now).order_by(Event.event_date.desc(), Event.id.desc())
+        if cursor:
+            query = query.filter(key < decode_event_cursor(cursor))
+    else:
+        raise ValueError(f'Unknown feed stream: {stream}')
+    events = query.limit(limit + 1).all()
+    next_cursor = encode_event_cursor(events[limit - 1]) if len(events) > limit else None
+    return events[:limit], next_cursor
+
+
+def club_feed_page(cursor=None, limit=CLUB_PAGE_SIZE):
+    query = Club.query.order_by(Club.id.asc())
+    if cursor:
+        query = query.filter(Club.id > int(cursor))
+    clubs = query.limit(limit + 1).all()
+    next_cursor = str(clubs[limit - 1].id) if len(clubs) > limit else None
+    return clubs[:limit], next_cursor
+
+
+# ─────────────────────────────────────────────
+#  CHAT – cursor paging and in-process pub/sub
+# ─────────────────────────────────────────────
+CHAT_PAGE_SIZE = 50
+CHAT_LONG_POLL_MAX = 25  # seconds
+CHAT_STREAM_KEEPALIVE = 15  # seconds
+
+
+class ChatSubscription:
+    """One reader's bounded inbox; `dropped` is set if it fell too far behind."""
+
+    def __init__(self, broker, club_id, buffer_size):
+        self.broker = broker
+        self.club_id = club_id
+        self.queue = queue.Queue(buffer_size)
+        self.dropped = False
+
+    def get(self, timeout):
+        """Next (kind, data) event, ('reset', None) once dropped, or None on timeout."""
+        if self.dropped:
+            return ('reset', None)
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return ('reset', None) if self.dropped else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.broker.unsubscribe(self)
+
+
+class ChatBroker:
+    """Fans chat events out to every subscriber of a club within this process.
+
+    Publishing never blocks: a subscriber whose buffer is full is dropped and
+    told to resync from the database. Works with threaded servers and with
+    gevent once `queue`/`threading` are monkey-patched. Events posted through
+    another worker process reach clients when they reconnect or poll.
+    """
+
+    def __init__(self, buffer_size=100):
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, club_id):
+        sub = ChatSubscription(self, club_id, self.buffer_size)
+        with self._lock:
+            self._subscribers.setdefault(club_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subscribers.get(sub.club_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.club_id]
+
+    def publish(self, club_id, kind, data):
+        with self._lock:
+            subs = list(self._subscribers.get(club_id, ()))
+        for sub in subs:
+            try:
+                sub.queue.put_nowait((kind, data))
+            except queue.Full:
+                sub.dropped = True
+                self.unsubscribe(sub)
+
+
+chat_broker = ChatBroker()
+
+
+def chat_history_page(club_id, after_id=None, before_id=None, limit=CHAT_PAGE_SIZE):
+    """Messages in id order: newer than `after_id`, older than `before_id`, or the latest page."""
+    query = Message.query.options(joinedload(Message.user)).filter(Message.club_id == club_id)
+    if after_id is not None:
+        return query.filter(Message.id > after_id).order_by(Message.id.asc()).limit(limit).all()
+    if before_id is not None:
+        query = query.filter(Message.id < before_id)
+    return query.order_by(Message.id.desc()).limit(limit).all()[::-1]
+
+
+def message_to_dict(m):
+    return {
+        'id': m.id,
+        'content': m.content,
+        'username': m.user.username,
+        'timestamp': m.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+        'is_pinned': m.is_pinned
+    }
+
+
+# ─────────────────────────────────────────────
+#  COMMIT HOOKS – run side effects only once a transaction lands
+# ─────────────────────────────────────────────
+def on_commit(session, callback):
+    """Queue `callback()` to run after `session` commits; dropped on rollback."""
+    session.info.setdefault('on_commit', []).append(callback)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _run_commit_hooks(session):
+    for callback in session.info.pop('on_commit', []):
+        callback()
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _drop_commit_hooks(session, previous_transaction):
+    for key in ('on_commit', 'counter_deltas', 'skill_dirty_users', 'skill_dirty_clubs', 'club_stats_rebuild',
+                'sentiment_bucket_entries'):
+        session.info.pop(key, None)
+
+
+# ─────────────────────────────────────────────
+#  GLOBAL COUNTERS – cached totals for the hero stats
+# ─────────────────────────────────────────────
+class GlobalCounters:
+    """In-process row counts kept in step with ORM inserts/deletes.
+
+    Deltas are collected per flush and applied on commit; a full resync runs
+    when the TTL expires or after a bulk `Query.delete()` the ORM can't count.
+    """
+
+    def __init__(self, models, ttl=300):
+        self.models = models
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._values = {}
+        self._synced_at = None
+
+    def snapshot(self):
+        with self._lock:
+            if self._synced_at is None or time.monotonic() - self._synced_at > self.ttl:
+                self._values = {key: model.query.count() for key, model in self.models.items()}
+                self._synced_at = time.monotonic()
+            return dict(self._values)
+
+    def apply(self, deltas):
+        with self._lock:
+            if self._synced_at is None:
+                return
+            for key, delta in deltas.items():
+                self._values[key] = max(0, self._values.get(key, 0) + delta)
+
+    def invalidate(self):
+        with self._lock:
+            self._synced_at = None
+
+
+global_counters = GlobalCounters({
+    'total_students': User,
+    'total_clubs': Club,
+    'total_events': Event,
+})
+
+
+def _counter_key(obj):
+    for key, model in global_counters.models.items():
+        if isinstance(obj, model):
+            return key
+    return None
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_counter_deltas(session, flush_context):
+    deltas = session.info.setdefault('counter_deltas', {})
+    for objs, sign in ((session.new, 1), (session.deleted, -1)):
+        for obj in objs:
+            key = _counter_key(obj)
+            if key:
+                deltas[key] = deltas.get(key, 0) + sign
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _watch_bulk_deletes(orm_execute_state):
+    if orm_execute_state.is_delete and orm_execute_state.bind_mapper is not None:
+        if orm_execute_state.bind_mapper.class_ in global_counters.models.values():
+            on_commit(orm_execute_state.session, global_counters.invalidate)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_counter_deltas(session):
+    deltas = session.info.pop('counter_deltas', None)
+    if deltas:
+        global_counters.apply(deltas)
+
+
+# ─────────────────────────────────────────────
+#  LEADERBOARD RANKS – ordered in-memory XP index
+# ─────────────────────────────────────────────
+class XPRankIndex:
+    """Users ordered by (xp desc, id asc) for rank, top-K and "around me" queries.
+
+    Rank lookups are bisects over a sorted key list (O(log n)). An XP change
+    moves one key with a list delete + insort, which is O(n) element shifting
+    (a memmove, cheap at campus scale) rather than a re-sort or a COUNT query.
+    Built from the database on first use and rebuilt when the TTL expires,
+    which also picks up writes made by other processes.
+    """
+
+    def __init__(self, ttl=600):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._keys = []
+        self._xp = {}
+        self._synced_at = None
+
+    def _ensure_synced(self):
+        if self._synced_at is None or time.monotonic() - self._synced_at > self.ttl:
+            self._xp = {user_id: xp or 0 for user_id, xp in db.session.query(User.id, User.xp)}
+            self._keys = sorted((-xp, user_id) for user_id, xp in self._xp.items())
+            self._synced_at = time.monotonic()
+
+    def update(self, user_id, xp):
+        """Move `user_id` to its new XP; `xp=None` removes the user."""
+        with self._lock:
+            if self._synced_at is None:
+                return
+            old = self._xp.pop(user_id, None)
+            if old is not None:
+                i = bisect.bisect_left(self._keys, (-old, user_id))
+                if i < len(self._keys) and self._keys[i] == (-old, user_id):
+                    del self._keys[i]
+            if xp is not None:
+                self._xp[user_id] = xp
+                bisect.insort(self._keys, (-xp, user_id))
+
+    def invalidate(self):
+        with self._lock:
+            self._synced_at = None
+
+    def total(self):
+        with self._lock:
+            self._ensure_synced()
+            return len(self._keys)
+
+    def rank(self, user_id):
+        """1-based position of `user_id`, or None if unknown."""
+        with self._lock:
+            self._ensure_synced()
+            xp = self._xp.get(user_id)
+            if xp is None:
+                return None
+            return bisect.bisect_left(self._keys, (-xp, user_id)) + 1
+
+    def top(self, k, offset=0):
+        """[(rank, user_id, xp), ...] for positions offset+1 .. offset+k."""
+        with self._lock:
+            self._ensure_synced()
+            return [(offset + i + 1, user_id, -neg_xp)
+                    for i, (neg_xp, user_id) in enumerate(self._keys[offset:offset + k])]
+
+    def around(self, user_id, radius=2):
+        """The user's own entry plus up to `radius` neighbours on each side."""
+        rank = self.rank(user_id)
+        if rank is None:
+            return []
+        start = max(rank - 1 - radius, 0)
+        return self.top(rank - 1 - start + radius + 1, offset=start)
+
 
+xp_rank_index = XPRankIndex()
 
 
+@event.listens_for(db.session, 'after_flush')
+def _track_xp_changes(session, flush_context):
+    for obj in session.new | session.dirty:
+        if not isinstance(obj, User):
+            continue
+        if obj in session.new or db.inspect(obj).attrs.xp.history.has_changes():
+            on_commit(session, lambda uid=obj.id, xp=obj.xp or 0: xp_rank_index.update(uid, xp))
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            on_commit(session, lambda uid=obj.id: xp_rank_index.update(uid, None))
 
 
+# ─────────────────────────────────────────────
+#  WINDOWED LEADERBOARDS – weekly/monthly/per-college from XPDailyTotal
+# ─────────────────────────────────────────────
+LEADERBOARD_PERIODS = {'all': None, 'week': 7, 'month': 30}
+
+
+class TTLCache:
+    """Small thread-safe memo for values that may be a little stale."""
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, key, compute):
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit and time.monotonic() - hit[0] <= self.ttl:
+                return hit[1]
+        value = compute()
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+        return value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+leaderboard_cache = TTLCache(ttl=60)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _roll_up_xp_events(session, flush_context):
+    totals = {}
+    for obj in session.new:
+        if isinstance(obj, XPEvent):
+            key = (obj.user_id, (obj.created_at or datetime.utcnow()).date())
+            totals[key] = totals.get(key, 0) + obj.amount
+    if not totals:
+        return
+    stmt = sqlite_insert(XPDailyTotal.__table__)
+    stmt = stmt.on_conflict_do_update(index_elements=['user_id', 'day'],
+                                      set_={'xp': XPDailyTotal.__table__.c.xp + stmt.excluded.xp})
+    session.connection().execute(stmt, [{'user_id': uid, 'day': day, 'xp': xp}
+                                        for (uid, day), xp in totals.items()])
+
+
+def period_leaderboard(period='all', college=None, limit=20):
+    """[(rank, user_id, xp), ...] for a period in LEADERBOARD_PERIODS, optionally one college.
+
+    Windowed totals sum the per-day rollups, never the raw ledger; results are
+    cached briefly since they're shared by every viewer.
+    """
+    if period == 'all' and not college:
+        return xp_rank_index.top(limit)
+
+    def compute():
+        days = LEADERBOARD_PERIODS[period]
+        if days is None:
+            query = (db.session.query(User.id, User.xp).filter(User.college == college)
+                     .order_by(User.xp.desc(), User.id.asc()))
+        else:
+            since = datetime.utcnow().date() - timedelta(days=days - 1)
+            total = db.func.sum(XPDailyTotal.xp).label('total')
+            query = db.session.query(XPDailyTotal.user_id, total).filter(XPDailyTotal.day >= since)
+            if college:
+                query = query.join(User, User.id == XPDailyTotal.user_id).filter(User.college == college)
+            query = query.group_by(XPDailyTotal.user_id).order_by(total.desc(), XPDailyTotal.user_id.asc())
+        return [(i + 1, user_id, xp or 0) for i, (user_id, xp) in enumerate(query.limit(limit))]
+
+    return leaderboard_cache.get(('board', period, college, limit), compute)
+
+
+def period_leaderboard_total(period='all', college=None):
+    """How many users the (period, college) board ranks: everyone with XP in the
+    window, limited to the college if one is given."""
+    if period == 'all' and not college:
+        return xp_rank_index.total()
+
+    def compute():
+        days = LEADERBOARD_PERIODS[period]
+        if days is None:
+            return User.query.filter(User.college == college).count()
+        since = datetime.utcnow().date() - timedelta(days=days - 1)
+        query = (db.session.query(db.func.count(db.distinct(XPDailyTotal.user_id)))
+                 .filter(XPDailyTotal.day >= since))
+        if college:
+            query = query.join(User, User.id == XPDailyTotal.user_id).filter(User.college == college)
+        return query.scalar()
+
+    return leaderboard_cache.get(('total', period, college), compute)
+
+
+def leaderboard_colleges():
+    return leaderboard_cache.get('colleges', lambda: sorted(
+        college for (college,) in db.session.query(User.college).filter(User.college.isnot(None)).distinct()
+        if college.strip()))
+
+
+def ranked_users(entries):
+    """Load the users behind rank entries in one query, as [(rank, user, xp), ...]."""
+    users = {u.id: u for u in User.query.filter(User.id.in_([uid for _, uid, _ in entries]))}
+    return [(rank, users[uid], xp) for rank, uid, xp in entries if uid in users]
+
+
+def rank_entry_to_dict(rank, user, xp):
+    return {
+        'rank': rank,
+        'user_id': user.id,
+        'username': user.username,
+        'college': user.college,
+        'xp': xp,
+        'level': user.level_info['level'],
+    }
+
+
+# ─────────────────────────────────────────────
+#  BADGE STATISTICS – how many students hold each badge
+# ─────────────────────────────────────────────
+class BadgeStats:
+    """Holder counts for every badge from one GROUP BY over UserBadge.
+
+    Cleared whenever a commit awards/removes a badge or adds/removes a user;
+    the TTL catches changes made by other processes.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counts = None
+        self._total = 0
+        self._synced_at = None
+
+    def _ensure_synced(self):
+        if self._synced_at is None or time.monotonic() - self._synced_at > self.ttl:
+            self._counts = dict(db.session.query(UserBadge.badge_name, db.func.count(UserBadge.id))
+                                .group_by(UserBadge.badge_name).all())
+            self._total = User.query.count()
+            self._synced_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._synced_at = None
+
+    def earned_percentages(self):
+        """{badge_name: whole percent of users holding it} for every defined badge."""
+        with self._lock:
+            self._ensure_synced()
+            if not self._total:
+                return {name: 0 for name in BADGE_DEFINITIONS}
+            return {name: int(self._counts.get(name, 0) / self._total * 100) for name in BADGE_DEFINITIONS}
+
+
+badge_stats = BadgeStats()
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_badge_changes(session, flush_context):
+    for obj in session.new | session.deleted:
+        if isinstance(obj, (User, UserBadge)):
+            on_commit(session, badge_stats.invalidate)
+            return
+
+
+# ─────────────────────────────────────────────
+#  ACTIVITY HEATMAP – daily per-user activity from UserActivityDay
+# ─────────────────────────────────────────────
+ACTIVITY_WINDOWS = (90, 365)
+ACTIVITY_COLUMNS = ('registrations', 'joins', 'feedback', 'messages')
+
+
+def _activity_sources():
+    """(model, UserActivityDay column, timestamp attribute) for each tracked action.
+    UserClub has no timestamp, so joins are counted from the moment they're flushed."""
+    return ((EventRegistration, 'registrations', 'registered_at'), (UserClub, 'joins', None),
+            (Feedback, 'feedback', 'timestamp'), (Message, 'messages', 'timestamp'))
+
+
+def _upsert_activity(connection, column, rows, replace=False):
+    """rows: [{'user_id', 'day', column}]; adds to (or with `replace`, overwrites) the column."""
+    table = UserActivityDay.__table__
+    stmt = sqlite_insert(table)
+    value = stmt.excluded[column] if replace else table.c[column] + stmt.excluded[column]
+    stmt = stmt.on_conflict_do_update(index_elements=['user_id', 'day'], set_={column: value})
+    connection.execute(stmt, [{**{c: 0 for c in ACTIVITY_COLUMNS}, **row} for row in rows])
+
+
+def rebuild_activity_days():
+    """Recount registrations, feedback and messages per user/day from the source
+    tables (joins can't be dated after the fact and are kept as recorded)."""
+    connection = db.session.connection()
+    table = UserActivityDay.__table__
+    rebuilt = [column for _, column, attr in _activity_sources() if attr]
+    connection.execute(table.update().values({column: 0 for column in rebuilt}))
+    for model, column, attr in _activity_sources():
+        if not attr:
+            continue
+        stamp = getattr(model, attr)
+        day = db.func.date(stamp)
+        rows = (db.session.query(model.user_id, day, db.func.count())
+                .filter(model.user_id.isnot(None), stamp.isnot(None))
+                .group_by(model.user_id, day).all())
+        if rows:
+            _upsert_activity(connection, column, [{'user_id': uid, 'day': datetime.strptime(d, '%Y-%m-%d').date(),
+                                                   column: n} for uid, d, n in rows], replace=True)
+    connection.execute(table.delete().where(sum(table.c[c] for c in ACTIVITY_COLUMNS) == 0))
+    db.session.commit()
+    return db.session.query(UserActivityDay).count()
+
+
+def activity_heatmap(user_id, days=ACTIVITY_WINDOWS[0]):
+    """{'YYYY-MM-DD': {'total', 'registrations', 'joins', 'feedback', 'messages'}} for
+    the last `days` days plus today; days without activity are left out."""
+    since = datetime.utcnow().date() - timedelta(days=days)
+    rows = (UserActivityDay.query
+            .filter(UserActivityDay.user_id == user_id, UserActivityDay.day >= since)
+            .order_by(UserActivityDay.day))
+    return {row.day.isoformat(): {'total': row.total, **{c: getattr(row, c) for c in ACTIVITY_COLUMNS}}
+            for row in rows}
+
+
+@event.listens_for(db.session, 'after_flush')
+def _roll_up_activity(session, flush_context):
+    counts = {}
+    for obj in session.new:
+        for model, column, attr in _activity_sources():
+            if isinstance(obj, model) and obj.user_id is not None:
+                # Server-side defaults (Feedback.timestamp) aren't loaded yet; they're "now" anyway
+                stamp = obj.__dict__.get(attr) if attr else None
+                key = (column, obj.user_id, (stamp or datetime.utcnow()).date())
+                counts[key] = counts.get(key, 0) + 1
+    if not counts:
+        return
+    by_column = {}
+    for (column, user_id, day), n in counts.items():
+        by_column.setdefault(column, []).append({'user_id': user_id, 'day': day, column: n})
+    connection = session.connection()
+    for column, rows in by_column.items():
+        _upsert_activity(connection, column, rows)
+
+
+# ─────────────────────────────────────────────
+#  SKILL VECTORS – materialized per-user skill points & parsed careers
+# ─────────────────────────────────────────────
+SKILL_SOURCE_MODELS = (UserSkill, UserClub, EventRegistration, ClubSkill)
+
+
+def rebuild_skill_vectors(user_ids=None):
+    """Recompute UserSkillVector rows for `user_ids` (everyone when None).
+
+    Event registrations only count once the event is in the past, so a full
+    rebuild also needs to run periodically (see nightly_skill_refresh.py).
+    """
+    now = datetime.utcnow()
+
+    def for_users(query, column):
+        return query if user_ids is None else query.filter(column.in_(user_ids))
+
+    manual = for_users(db.session.query(UserSkill.user_id, UserSkill.skill_id, db.func.sum(UserSkill.amount)),
+                       UserSkill.user_id).group_by(UserSkill.user_id, UserSkill.skill_id)
+    clubs = for_users(db.session.query(UserClub.user_id, ClubSkill.skill_id, db.func.sum(ClubSkill.points))
+                      .join(ClubSkill, ClubSkill.club_id == UserClub.club_id)
+                      .filter(UserClub.status == 'approved'),
+                      UserClub.user_id).group_by(UserClub.user_id, ClubSkill.skill_id)
+    events = for_users(db.session.query(EventRegistration.user_id, ClubSkill.skill_id,
+                                        db.func.sum(db.cast(ClubSkill.points * 0.5, db.Integer)))
+                       .join(Event, Event.id == EventRegistration.event_id)
+                       .join(ClubSkill, ClubSkill.club_id == Event.club_id)
+                       .filter(Event.event_date < now),
+                       EventRegistration.user_id).group_by(EventRegistration.user_id, ClubSkill.skill_id)
+
+    vectors = {}
+    for query in (manual, clubs, events):
+        for user_id, skill_id, points in query:
+            vectors[(user_id, skill_id)] = vectors.get((user_id, skill_id), 0) + (points or 0)
+
+    table = UserSkillVector.__table__
+    delete = table.delete()
+    if user_ids is not None:
+        delete = delete.where(table.c.user_id.in_(user_ids))
+    db.session.execute(delete)
+    if vectors:
+        db.session.execute(table.insert(), [{'user_id': uid, 'skill_id': sid, 'points': pts}
+                                            for (uid, sid), pts in vectors.items()])
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_skill_sources(session, flush_context):
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, ClubSkill):
+            session.info.setdefault('skill_dirty_clubs', set()).add(obj.club_id)
+        elif isinstance(obj, SKILL_SOURCE_MODELS):
+            session.info.setdefault('skill_dirty_users', set()).add(obj.user_id)
+
+
+def bulk_delete_targets(orm_execute_state, column):
+    """Distinct `column` values of the rows a Query.delete() is about to remove."""
+    where = orm_execute_state.statement.whereclause
+    query = db.select(column).distinct()
+    if where is not None:
+        query = query.where(where)
+    return {value for (value,) in orm_execute_state.session.execute(query)}
+
+
+def _club_skill_users(session, club_ids):
+    """Members and event registrants of `club_ids` – whose vectors a ClubSkill change touches."""
+    users = {uid for (uid,) in session.query(UserClub.user_id).filter(UserClub.club_id.in_(club_ids))}
+    users |= {uid for (uid,) in session.query(EventRegistration.user_id)
+              .join(Event, Event.id == EventRegistration.event_id).filter(Event.club_id.in_(club_ids))}
+    return users
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _watch_skill_bulk_deletes(orm_execute_state):
+    # Query.delete() skips the flush, so look up whose rows are going before they go
+    if orm_execute_state.is_delete and orm_execute_state.bind_mapper is not None:
+        model = orm_execute_state.bind_mapper.class_
+        if model not in SKILL_SOURCE_MODELS:
+            return
+        session = orm_execute_state.session
+        if model is ClubSkill:
+            # resolve members now: delete_club removes the memberships right after
+            users = _club_skill_users(session, bulk_delete_targets(orm_execute_state, ClubSkill.club_id))
+        else:
+            users = bulk_delete_targets(orm_execute_state, model.user_id)
+        session.info.setdefault('skill_dirty_users', set()).update(users)
+
+
+@event.listens_for(db.session, 'before_commit')
+def _refresh_skill_vectors(session):
+    session.flush()
+    users = session.info.pop('skill_dirty_users', set())
+    clubs = session.info.pop('skill_dirty_clubs', set())
+    if clubs:
+        users |= _club_skill_users(session, clubs)
+    if users:
+        rebuild_skill_vectors(users)
+
+
+career_cache = TTLCache(ttl=3600)
+
+
+def career_requirements():
+    """[(career_name, [required skill names]), ...] with the JSON parsed once per cache cycle."""
+    def load():
+        careers = []
+        for career in Career.query.order_by(Career.id):
+            required = json.loads(career.required_skills)
+            if required:
+                careers.append((career.name, required))
+        return careers
+    return career_cache.get('requirements', load)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_career_changes(session, flush_context):
+    if any(isinstance(obj, Career) for obj in session.new | session.dirty | session.deleted):
+        on_commit(session, career_cache.invalidate)
+
+
+# ─────────────────────────────────────────────
+#  CLUB RECOMMENDATIONS – term index over club text
+# ─────────────────────────────────────────────
+# Interest -> Keywords mapping
+INTEREST_MAP = {
+    'Coding': ['tech', 'code', 'develop', 'hack', 'programming', 'software'],
+    'Design': ['art', 'design', 'creative', 'paint', 'ui', 'ux', 'graphic'],
+    'Public Speaking': ['debate', 'speak', 'toastmaster', 'orator', 'speech'],
+    'Leadership': ['lead', 'manage', 'council', 'entrepreneur', 'business'],
+    'Music': ['music', 'band', 'sing', 'instrument', 'jam'],
+    'Photography': ['photo', 'camera', 'media', 'film', 'lens'],
+    'Gaming': ['game', 'esport', 'play station', 'pc'],
+    'Social Service': ['social', 'service', 'ngo', 'help', 'volunteer', 'nss']
+}
+
+
+class ClubRecommender:
+    """Term -> club ids index over each club's lowercased name/description/category,
+    blended with the offline ClubSimilarity neighbours.
+
+    Terms keep the substring semantics of the old per-request scan ("develop"
+    matches "developers"): interest keywords are indexed when the clubs are
+    loaded, free-text hobbies the first time someone asks for them (kept in
+    a bounded LRU). Scored
+    results are memoized per (hobbies, excluded clubs, club history). Cleared
+    whenever a commit touches a Club; the TTL picks up changes made by other
+    processes, including a fresh similarity build.
+    """
+
+    MAX_CACHED_RESULTS = 1024
+    MAX_CACHED_TERMS = 2048
+    CF_POINTS = 30   # keyword-score points for a club fully "co-joined" with the user's history
+
+    def __init__(self, ttl=600):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._texts = {}
+        self._postings = OrderedDict()
+        self._interests = {}
+        self._neighbors = {}
+        self._results = {}
+        self._synced_at = None
+
+    def _ensure_synced(self):
+        if self._synced_at is None or time.monotonic() - self._synced_at > self.ttl:
+            self._texts = {
+                club_id: (name + " " + description + " " + (category or "")).lower()
+                for club_id, name, description, category in
+                db.session.query(Club.id, Club.name, Club.description, Club.category).order_by(Club.id)
+            }
+            self._postings = OrderedDict()
+            self._interests = {
+                interest: frozenset().union(*(self._clubs_with(kw) for kw in keywords))
+                for interest, keywords in INTEREST_MAP.items()
+            }
+            self._neighbors = {}
+            for club_id, similar_id, score in (db.session.query(ClubSimilarity.club_id, ClubSimilarity.similar_club_id,
+                                                                ClubSimilarity.score)):
+                self._neighbors.setdefault(club_id, []).append((similar_id, score))
+            self._results = {}
+            self._synced_at = time.monotonic()
+
+    def _clubs_with(self, term):
+        """Clubs whose text contains `term`; an LRU of MAX_CACHED_TERMS terms."""
+        clubs = self._postings.get(term)
+        if clubs is None:
+            clubs = self._postings[term] = frozenset(cid for cid, text in self._texts.items() if term in text)
+            if len(self._postings) > self.MAX_CACHED_TERMS:
+                self._postings.popitem(last=False)
+        else:
+            self._postings.move_to_end(term)
+        return clubs
+
+    def invalidate(self):
+        with self._lock:
+            self._synced_at = None
+
+    def recommend(self, hobbies, exclude_ids=(), history=()):
+        """[(club_id, match_percentage), ...] best first.
+
+        `hobbies` drive the keyword score, `history` (clubs the user joined or
+        attended events of) pulls in neighbours from ClubSimilarity.
+        """
+        key = (tuple(hobbies), frozenset(exclude_ids), frozenset(history))
+        with self._lock:
+            self._ensure_synced()
+            if key in self._results:
+                return self._results[key]
+            scores = {}
+            for hobby in hobbies:
+                # Direct match
+                for cid in self._clubs_with(hobby.lower()):
+                    scores[cid] = scores.get(cid, 0) + 20
+                # Semantic match via mapping, counted once per hobby
+                for cid in self._interests.get(hobby.strip().title(), ()):
+                    scores[cid] = scores.get(cid, 0) + 15
+            # Collaborative filtering: summed neighbour similarity, capped at 1
+            affinity = {}
+            for seen in history:
+                for cid, score in self._neighbors.get(seen, ()):
+                    affinity[cid] = affinity.get(cid, 0) + score
+            for cid, total in affinity.items():
+                points = round(min(total, 1.0) * self.CF_POINTS)
+                if points:
+                    scores[cid] = scores.get(cid, 0) + points
+            ranked = sorted(((cid, min(score + 40, 98)) for cid, score in scores.items()
+                             if cid not in exclude_ids),
+                            key=lambda item: (-item[1], item[0]))
+            if len(self._results) >= self.MAX_CACHED_RESULTS:
+                self._results.clear()
+            self._results[key] = ranked
+            return ranked
+
+
+club_recommender = ClubRecommender()
+
+
+def recommend_clubs_for(user, limit=None):
+    """Clubs for `user` from their hobbies, skipping ones they joined or manage.
+
+    Each returned Club carries a `match_percentage` attribute.
+    """
+    hobbies = [h.strip() for h in user.hobbies.split(',')] if user.hobbies else []
+    joined_ids = {cid for (cid,) in db.session.query(UserClub.club_id).filter_by(user_id=user.id)}
+    attended_ids = {cid for (cid,) in db.session.query(Event.club_id).join(
+        EventRegistration, EventRegistration.event_id == Event.id).filter(EventRegistration.user_id == user.id)}
+    if not hobbies and not (joined_ids | attended_ids):
+        return []
+    exclude_ids = joined_ids | {cid for (cid,) in db.session.query(Club.id).filter_by(manager_id=user.id)}
+    ranked = club_recommender.recommend(hobbies, exclude_ids, joined_ids | attended_ids)[:limit]
+    if not ranked:
+        return []
+    clubs = {c.id: c for c in Club.query.filter(Club.id.in_([cid for cid, _ in ranked]))}
+    recommended = []
+    for cid, pct in ranked:
+        club = clubs.get(cid)
+        if club is not None:
+            club.match_percentage = pct
+            recommended.append(club)
+    return recommended
+
+
+def rebuild_club_similarity(top_k=20, event_weight=0.5):
+    """Recompute ClubSimilarity from membership / event registration co-occurrence.
+
+    Each user is a sparse vector over clubs (1 for an approved membership, `event_weight`
+    for attending one of the club's events); pairs are scored by cosine
+    similarity and only the `top_k` neighbours per club are stored. Run
+    offline (see build_club_similarity.py), not per request.
+    """
+    baskets = {}
+    for user_id, club_id in (db.session.query(UserClub.user_id, UserClub.club_id)
+                             .filter(UserClub.status == 'approved')):
+        baskets.setdefault(user_id, {})[club_id] = 1.0
+    for user_id, club_id in (db.session.query(EventRegistration.user_id, Event.club_id)
+                             .join(Event, Event.id == EventRegistration.event_id).distinct()):
+        clubs = baskets.setdefault(user_id, {})
+        clubs[club_id] = max(clubs.get(club_id, 0), event_weight)
+
+    norms, dots = {}, {}
+    for clubs in baskets.values():
+        items = sorted(clubs.items())
+        for i, (a, wa) in enumerate(items):
+            norms[a] = norms.get(a, 0) + wa * wa
+            for b, wb in items[i + 1:]:
+                dots[(a, b)] = dots.get((a, b), 0) + wa * wb
+
+    neighbors = {}
+    for (a, b), dot in dots.items():
+        score = dot / math.sqrt(norms[a] * norms[b])
+        neighbors.setdefault(a, []).append((score, b))
+        neighbors.setdefault(b, []).append((score, a))
+
+    ClubSimilarity.query.delete()
+    rows = []
+    for club_id, scored in neighbors.items():
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        rows.extend({'club_id': club_id, 'similar_club_id': other, 'score': round(score, 4)}
+                    for score, other in scored[:top_k])
+    if rows:
+        db.session.execute(ClubSimilarity.__table__.insert(), rows)
+    db.session.commit()
+    return len(rows)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_club_changes(session, flush_context):
+    if any(isinstance(obj, Club) for obj in session.new | session.dirty | session.deleted):
+        on_commit(session, club_recommender.invalidate)
+
+
+# ─────────────────────────────────────────────
+#  SENTIMENT PIPELINE – feedback is scored off the request thread
+# ─────────────────────────────────────────────
+SENTIMENT_PENDING = 'Pending'
+SENTIMENT_CLAIM_TIMEOUT = timedelta(minutes=5)   # after this another process may take over a claimed row
+
+
+def analyze_sentiment(content):
+    """(polarity, label) for a piece of feedback text; memoized by sentiment_service."""
+    return sentiment_service.score(content)
+
+
+def apply_sentiment_scores(scores):
+    """Write {feedback_id: (score, label)} back with one bulk UPDATE (caller commits)."""
+    if scores:
+        deltas, newly_scored, rescored = {}, [], []
+        for fid, club_id, old_label, old_score, timestamp in (db.session.query(
+                Feedback.id, Feedback.club_id, Feedback.sentiment_label, Feedback.sentiment_score, Feedback.timestamp)
+                .filter(Feedback.id.in_(list(scores)))):
+            _add_feedback_delta(deltas, club_id, old_label, old_score, -1)
+            _add_feedback_delta(deltas, club_id, scores[fid][1], scores[fid][0], 1)
+            if old_label == SENTIMENT_PENDING:
+                newly_scored.append((club_id, timestamp.date(), scores[fid][0]))
+            else:
+                rescored.append((club_id, timestamp.date()))
+        connection = db.session.connection()
+        apply_club_stat_deltas(connection, deltas, stale_clubs=deltas.keys())
+        db.session.execute(db.update(Feedback), [
+            {'id': fid, 'sentiment_score': score, 'sentiment_label': label}
+            for fid, (score, label) in scores.items()])
+        add_to_sentiment_buckets(connection, newly_scored)
+        recompute_sentiment_buckets(connection, rescored)
+
+
+class SentimentWorker:
+    """Scores pending Feedback rows on one background thread.
+
+    TextBlob scoring is CPU-bound, so more threads would only contend for the
+    GIL; bulk rescoring across processes is rescore_feedback.py's job. Ids
+    handed to submit() are grouped into batches (up to `batch_size`, or
+    whatever arrived within `max_delay` seconds). Each batch is first claimed
+    (Feedback.claimed_at) so web processes sharing the database never score
+    the same row twice, then written back with one bulk UPDATE. Every
+    `sweep_interval` seconds, starting at boot, it also picks up pending rows
+    nobody holds a live claim on: ones left by a restart or a crashed process.
+    """
+
+    def __init__(self, batch_size=32, max_delay=0.5, sweep_interval=60):
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.sweep_interval = sweep_interval
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._dispatch, name='sentiment-worker', daemon=True).start()
+
+    def submit(self, feedback_ids):
+        self.start()
+        for fid in feedback_ids:
+            self._queue.put(fid)
+
+    def _claimable(self, now):
+        return db.and_(Feedback.sentiment_label == SENTIMENT_PENDING,
+                       db.or_(Feedback.claimed_at.is_(None), Feedback.claimed_at < now - SENTIMENT_CLAIM_TIMEOUT))
+
+    def _sweep(self):
+        with app.app_context():
+            try:
+                for (fid,) in db.session.query(Feedback.id).filter(self._claimable(datetime.utcnow())):
+                    self._queue.put(fid)
+            except Exception:
+                app.logger.exception('Could not look up pending feedback')
+            finally:
+                db.session.remove()
+
+    def _next_batch(self, timeout):
+        try:
+            batch = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _dispatch(self):
+        sentiment_service.warm()
+        next_sweep = 0
+        while True:
+            if time.monotonic() >= next_sweep:
+                self._sweep()
+                next_sweep = time.monotonic() + self.sweep_interval
+            batch = self._next_batch(max(next_sweep - time.monotonic(), 0.01))
+            if batch:
+                self._score_batch(batch)
+
+    def _claim(self, feedback_ids):
+        """Mark the still-claimable rows among `feedback_ids` as ours; returns their ids."""
+        now = datetime.utcnow()
+        claimed = db.session.execute(
+            db.update(Feedback).where(Feedback.id.in_(set(feedback_ids)), self._claimable(now))
+            .values(claimed_at=now).returning(Feedback.id)).scalars().all()
+        db.session.commit()
+        return claimed
+
+    def _score_batch(self, feedback_ids):
+        with app.app_context():
+            claimed = []
+            try:
+                claimed = self._claim(feedback_ids)
+                if not claimed:
+                    return
+                rows = db.session.query(Feedback.id, Feedback.content).filter(Feedback.id.in_(claimed)).all()
+                scores = {fid: analyze_sentiment(content) for fid, content in rows}
+                apply_sentiment_scores(scores)
+                db.session.execute(db.update(Feedback).where(Feedback.id.in_(claimed)).values(claimed_at=None))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                app.logger.exception('Sentiment scoring failed for feedback %s', feedback_ids)
+                if claimed:
+                    # Release so the next sweep retries them
+                    try:
+                        db.session.execute(db.update(Feedback).where(Feedback.id.in_(claimed)).values(claimed_at=None))
+                        db.session.commit()
+                    except Exception:
+                        db.session.rollback()
+            finally:
+                db.session.remove()
+
+
+sentiment_worker = SentimentWorker()
+
+
+@event.listens_for(db.session, 'after_flush')
+def _queue_pending_feedback(session, flush_context):
+    ids = [obj.id for obj in session.new
+           if isinstance(obj, Feedback) and obj.sentiment_label == SENTIMENT_PENDING]
+    if ids:
+        on_commit(session, lambda: sentiment_worker.submit(ids))
+
+
+# ─────────────────────────────────────────────
+#  CLUB ROLLUPS – dashboard numbers without touching feedback/events
+# ─────────────────────────────────────────────
+LABEL_COLUMNS = {'Positive': 'positive', 'Negative': 'negative', 'Neutral': 'neutral', SENTIMENT_PENDING: 'pending'}
+TREND_WINDOW_DAYS = 30
+
+
+def _bump(deltas, club_id, column, amount):
+    club = deltas.setdefault(club_id, {})
+    club[column] = club.get(column, 0) + amount
+
+
+def _add_feedback_delta(deltas, club_id, label, score, sign):
+    _bump(deltas, club_id, 'feedback', sign)
+    _bump(deltas, club_id, LABEL_COLUMNS.get(label, 'neutral'), sign)
+    if label != SENTIMENT_PENDING:
+        _bump(deltas, club_id, 'sentiment_sum', sign * (score or 0))
+
+
+def apply_club_stat_deltas(connection, deltas, stale_clubs=()):
+    """Add {club_id: {column: delta}} onto existing ClubStats rows, clearing
+    `trend_day` for `stale_clubs` so their trend is recomputed on next view.
+
+    Clubs without a row are skipped; dashboard_club_stats builds them from
+    scratch the first time they're needed.
+    """
+    table = ClubStats.__table__
+    for club_id, changes in deltas.items():
+        values = {col: table.c[col] + delta for col, delta in changes.items() if delta}
+        if club_id in stale_clubs:
+            values['trend_day'] = None
+        if values:
+            connection.execute(table.update().where(table.c.club_id == club_id).values(**values))
+
+
+def rebuild_club_stats(club_ids=None):
+    """Recompute ClubStats from the base tables for `club_ids` (every club when None)."""
+    count = db.func.count()
+
+    def for_clubs(query, column):
+        return query if club_ids is None else query.filter(column.in_(club_ids))
+
+    ids = club_ids if club_ids is not None else [cid for (cid,) in db.session.query(Club.id)]
+    rows = {cid: {'club_id': cid, 'members': 0, 'events': 0, 'feedback': 0, 'positive': 0, 'negative': 0,
+                  'neutral': 0, 'pending': 0, 'sentiment_sum': 0.0, 'trend_day': None} for cid in ids}
+    for cid, n in for_clubs(db.session.query(UserClub.club_id, count).filter(UserClub.status == 'approved'),
+                            UserClub.club_id).group_by(UserClub.club_id):
+        rows[cid]['members'] = n
+    for cid, n in for_clubs(db.session.query(Event.club_id, count), Event.club_id).group_by(Event.club_id):
+        if cid in rows:
+            rows[cid]['events'] = n
+    for cid, label, n, total in for_clubs(
+            db.session.query(Feedback.club_id, Feedback.sentiment_label, count, db.func.sum(Feedback.sentiment_score)),
+            Feedback.club_id).group_by(Feedback.club_id, Feedback.sentiment_label):
+        if cid not in rows:
+            continue
+        rows[cid]['feedback'] += n
+        rows[cid][LABEL_COLUMNS.get(label, 'neutral')] += n
+        if label != SENTIMENT_PENDING:
+            rows[cid]['sentiment_sum'] += total or 0
+
+    table = ClubStats.__table__
+    delete = table.delete()
+    if club_ids is not None:
+        delete = delete.where(table.c.club_id.in_(club_ids))
+    db.session.execute(delete)
+    if rows:
+        db.session.execute(table.insert(), list(rows.values()))
+
+
+def refresh_club_trends(club_ids):
+    """Recompute the last-30 / previous-30 day sentiment windows for `club_ids`."""
+    today = datetime.utcnow().date()
+    recent_start = datetime.combine(today - timedelta(days=TREND_WINDOW_DAYS - 1), datetime.min.time())
+    prior_start = recent_start - timedelta(days=TREND_WINDOW_DAYS)
+    is_recent = Feedback.timestamp >= recent_start
+    windows = {cid: {'recent_count': 0, 'recent_sum': 0.0, 'prior_count': 0, 'prior_sum': 0.0} for cid in club_ids}
+    for cid, recent, n, total in (db.session.query(Feedback.club_id, is_recent, db.func.count(),
+                                                   db.func.sum(Feedback.sentiment_score))
+                                  .filter(Feedback.club_id.in_(club_ids), Feedback.timestamp >= prior_start,
+                                          Feedback.sentiment_label != SENTIMENT_PENDING)
+                                  .group_by(Feedback.club_id, is_recent)):
+        prefix = 'recent' if recent else 'prior'
+        windows[cid][f'{prefix}_count'] = n
+        windows[cid][f'{prefix}_sum'] = total or 0.0
+    table = ClubStats.__table__
+    for cid, values in windows.items():
+        db.session.execute(table.update().where(table.c.club_id == cid).values(trend_day=today, **values))
+
+
+def dashboard_club_stats(clubs):
+    """{club_id: ClubStats} for the given clubs, building missing rows / stale trends first."""
+    ids = [c.id for c in clubs]
+    if not ids:
+        return {}
+    stats = {s.club_id: s for s in ClubStats.query.filter(ClubStats.club_id.in_(ids))}
+    missing = [cid for cid in ids if cid not in stats]
+    stale = [cid for cid in ids if cid in missing or stats[cid].trend_day != datetime.utcnow().date()]
+    if stale:
+        if missing:
+            rebuild_club_stats(missing)
+        refresh_club_trends(stale)
+        db.session.commit()
+        stats = {s.club_id: s for s in ClubStats.query.filter(ClubStats.club_id.in_(ids))}
+    return stats
+
+
+@event.listens_for(db.session, 'after_flush')
+def _roll_up_club_stats(session, flush_context):
+    deltas, stale = {}, set()
+    table = ClubStats.__table__
+    connection = session.connection()
+    for objs, sign in ((session.new, 1), (session.deleted, -1)):
+        for obj in objs:
+            if isinstance(obj, Club):
+                if sign > 0:
+                    connection.execute(sqlite_insert(table).values(club_id=obj.id).on_conflict_do_nothing())
+                else:
+                    connection.execute(table.delete().where(table.c.club_id == obj.id))
+            elif isinstance(obj, UserClub) and obj.status == 'approved':
+                _bump(deltas, obj.club_id, 'members', sign)
+            elif isinstance(obj, Event):
+                _bump(deltas, obj.club_id, 'events', sign)
+            elif isinstance(obj, Feedback):
+                _add_feedback_delta(deltas, obj.club_id, obj.sentiment_label, obj.sentiment_score, sign)
+                stale.add(obj.club_id)
+    for obj in session.dirty:
+        if isinstance(obj, UserClub):
+            added, _, removed = db.inspect(obj).attrs.status.history
+            change = ('approved' in added) - ('approved' in removed)
+            if change:
+                _bump(deltas, obj.club_id, 'members', change)
+    if deltas:
+        apply_club_stat_deltas(connection, deltas, stale_clubs=stale)
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _watch_club_stat_bulk_deletes(orm_execute_state):
+    # Query.delete() skips the flush, so note which clubs are losing rows before they go
+    if orm_execute_state.is_delete and orm_execute_state.bind_mapper is not None:
+        model = orm_execute_state.bind_mapper.class_
+        if model in (UserClub, Event, Feedback):
+            clubs = bulk_delete_targets(orm_execute_state, model.club_id)
+            orm_execute_state.session.info.setdefault('club_stats_rebuild', set()).update(clubs)
+
+
+@event.listens_for(db.session, 'before_commit')
+def _rebuild_club_stats(session):
+    if session.info.get('club_stats_rebuild'):
+        session.flush()
+        clubs = session.info.pop('club_stats_rebuild')
+        # a deleted club's row already went with it in _roll_up_club_stats
+        remaining = [cid for (cid,) in session.query(Club.id).filter(Club.id.in_(clubs))]
+        if remaining:
+            rebuild_club_stats(remaining)
+
+
+# ─────────────────────────────────────────────
+#  SENTIMENT TIME SERIES – day/week buckets per club
+# ─────────────────────────────────────────────
+SENTIMENT_KEEP_DAILY_DAYS = 90   # older day buckets get compacted into weeks
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def _bucket_keys(connection, entries):
+    """Map (club_id, day) pairs to the bucket that covers them: the week bucket
+    if that week was already compacted, the day bucket otherwise."""
+    table = SentimentBucket.__table__
+    pairs = {(club_id, week_start(day)) for club_id, day in entries}
+    compacted = set()
+    if pairs:
+        compacted = {(cid, start) for cid, start in connection.execute(
+            db.select(table.c.club_id, table.c.start).where(
+                table.c.granularity == 'week',
+                tuple_(table.c.club_id, table.c.start).in_(list(pairs))))}
+    return {(club_id, day): (club_id, 'week', week_start(day)) if (club_id, week_start(day)) in compacted
+            else (club_id, 'day', day) for club_id, day in entries}
+
+
+def _merge_buckets(connection, buckets):
+    """Upsert {(club_id, granularity, start): [count, sum, min, max]} into existing buckets."""
+    if not buckets:
+        return
+    table = SentimentBucket.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(index_elements=['club_id', 'granularity', 'start'], set_={
+        'count': table.c.count + stmt.excluded.count,
+        'score_sum': table.c.score_sum + stmt.excluded.score_sum,
+        'score_min': db.func.min(table.c.score_min, stmt.excluded.score_min),
+        'score_max': db.func.max(table.c.score_max, stmt.excluded.score_max),
+    })
+    connection.execute(stmt, [{'club_id': cid, 'granularity': gran, 'start': start, 'count': n,
+                               'score_sum': total, 'score_min': low, 'score_max': high}
+                              for (cid, gran, start), (n, total, low, high) in buckets.items()])
+
+
+def add_to_sentiment_buckets(connection, scored):
+    """Fold newly scored feedback [(club_id, day, score), ...] into its buckets."""
+    if not scored:
+        return
+    keys = _bucket_keys(connection, [(cid, day) for cid, day, _ in scored])
+    buckets = {}
+    for cid, day, score in scored:
+        b = buckets.setdefault(keys[(cid, day)], [0, 0.0, score, score])
+        b[0] += 1
+        b[1] += score
+        b[2] = min(b[2], score)
+        b[3] = max(b[3], score)
+    _merge_buckets(connection, buckets)
+
+
+def recompute_sentiment_buckets(connection, entries):
+    """Re-aggregate the buckets covering [(club_id, day), ...] from Feedback (after
+    a delete or rescore, where min/max can't be adjusted incrementally)."""
+    if not entries:
+        return
+    table = SentimentBucket.__table__
+    for cid, gran, start in set(_bucket_keys(connection, entries).values()):
+        begin = datetime.combine(start, datetime.min.time())
+        end = begin + timedelta(days=7 if gran == 'week' else 1)
+        n, total, low, high = connection.execute(
+            db.select(db.func.count(), db.func.sum(Feedback.sentiment_score),
+                      db.func.min(Feedback.sentiment_score), db.func.max(Feedback.sentiment_score))
+            .where(Feedback.club_id == cid, Feedback.sentiment_label != SENTIMENT_PENDING,
+                   Feedback.timestamp >= begin, Feedback.timestamp < end)).one()
+        key = (table.c.club_id == cid) & (table.c.granularity == gran) & (table.c.start == start)
+        connection.execute(table.delete().where(key))
+        if n:
+            connection.execute(table.insert().values(club_id=cid, granularity=gran, start=start, count=n,
+                                                     score_sum=total, score_min=low, score_max=high))
+
+
+def compact_sentiment_buckets(keep_days=SENTIMENT_KEEP_DAILY_DAYS):
+    """Merge day buckets of whole weeks older than `keep_days` into week buckets."""
+    table = SentimentBucket.__table__
+    cutoff = week_start(datetime.utcnow().date() - timedelta(days=keep_days))
+    old = db.session.execute(db.select(table.c.club_id, table.c.start, table.c.count, table.c.score_sum,
+                                       table.c.score_min, table.c.score_max)
+                             .where(table.c.granularity == 'day', table.c.start < cutoff)).all()
+    weeks = {}
+    for cid, start, n, total, low, high in old:
+        w = weeks.setdefault((cid, 'week', week_start(start)), [0, 0.0, low, high])
+        w[0] += n
+        w[1] += total
+        w[2] = min(w[2], low)
+        w[3] = max(w[3], high)
+    _merge_buckets(db.session.connection(), weeks)
+    db.session.execute(table.delete().where(table.c.granularity == 'day', table.c.start < cutoff))
+    return len(old), len(weeks)
+
+
+def rebuild_sentiment_buckets(keep_days=SENTIMENT_KEEP_DAILY_DAYS):
+    """Recompute every bucket from Feedback, then compact (backfill / after bulk deletes)."""
+    table = SentimentBucket.__table__
+    day = db.func.date(Feedback.timestamp)
+    rows = (db.session.query(Feedback.club_id, day, db.func.count(), db.func.sum(Feedback.sentiment_score),
+                             db.func.min(Feedback.sentiment_score), db.func.max(Feedback.sentiment_score))
+            .filter(Feedback.sentiment_label != SENTIMENT_PENDING)
+            .group_by(Feedback.club_id, day).all())
+    db.session.execute(table.delete())
+    if rows:
+        db.session.execute(table.insert(), [
+            {'club_id': cid, 'granularity': 'day', 'start': datetime.strptime(d, '%Y-%m-%d').date(),
+             'count': n, 'score_sum': total, 'score_min': low, 'score_max': high}
+            for cid, d, n, total, low, high in rows])
+    compact_sentiment_buckets(keep_days)
+
+
+def sentiment_series(club_id, granularity='week', days=365):
+    """Chart-ready series for one club over the last `days`.
+
+    'week' rolls day buckets up into their week (the first week is always
+    whole); 'day' returns day buckets and falls back to the week buckets for
+    the compacted (older) range.
+    """
+    table = SentimentBucket.__table__
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    if granularity == 'week':
+        since = week_start(since)
+    rows = db.session.execute(db.select(table.c.granularity, table.c.start, table.c.count, table.c.score_sum,
+                                        table.c.score_min, table.c.score_max)
+                              .where(table.c.club_id == club_id, table.c.start >= week_start(since))
+                              .order_by(table.c.start)).all()
+    points = {}
+    for gran, start, n, total, low, high in rows:
+        if gran == 'day' and start < since:
+            continue
+        key = (week_start(start), 'week') if granularity == 'week' else (start, gran)
+        p = points.setdefault(key, [0, 0.0, low, high])
+        p[0] += n
+        p[1] += total
+        p[2] = min(p[2], low)
+        p[3] = max(p[3], high)
+    ordered = sorted(points.items())
+    return {
+        'club_id': club_id,
+        'granularity': granularity,
+        'labels': [start.isoformat() for (start, _), _ in ordered],
+        'periods': [gran for (_, gran), _ in ordered],
+        'count': [n for _, (n, _, _, _) in ordered],
+        'mean': [round(total / n, 4) for _, (n, total, _, _) in ordered],
+        'min': [low for _, (_, _, low, _) in ordered],
+        'max': [high for _, (_, _, _, high) in ordered],
+    }
+
+
+@event.listens_for(db.session, 'after_flush')
+def _bucket_feedback_changes(session, flush_context):
+    connection = session.connection()
+    scored, removed = [], []
+    for obj in session.new:
+        if isinstance(obj, Feedback) and obj.sentiment_label != SENTIMENT_PENDING:
+            scored.append((obj.club_id, obj.timestamp.date(), obj.sentiment_score))
+    for obj in session.deleted:
+        if isinstance(obj, Feedback) and obj.sentiment_label != SENTIMENT_PENDING:
+            removed.append((obj.club_id, obj.timestamp.date()))
+        elif isinstance(obj, Club):
+            table = SentimentBucket.__table__
+            connection.execute(table.delete().where(table.c.club_id == obj.id))
+    add_to_sentiment_buckets(connection, scored)
+    recompute_sentiment_buckets(connection, removed)
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _watch_bucket_bulk_deletes(orm_execute_state):
+    # Query.delete() skips the flush; note the (club, day) buckets losing feedback before it goes
+    if orm_execute_state.is_delete and orm_execute_state.bind_mapper is not None:
+        if orm_execute_state.bind_mapper.class_ is Feedback:
+            day = db.func.date(Feedback.timestamp)
+            query = db.select(Feedback.club_id, day).distinct().where(Feedback.sentiment_label != SENTIMENT_PENDING)
+            if orm_execute_state.statement.whereclause is not None:
+                query = query.where(orm_execute_state.statement.whereclause)
+            entries = {(cid, datetime.strptime(d, '%Y-%m-%d').date())
+                       for cid, d in orm_execute_state.session.execute(query)}
+            orm_execute_state.session.info.setdefault('sentiment_bucket_entries', set()).update(entries)
+
+
+@event.listens_for(db.session, 'before_commit')
+def _recompute_bulk_deleted_buckets(session):
+    if session.info.get('sentiment_bucket_entries'):
+        session.flush()
+        recompute_sentiment_buckets(session.connection(), session.info.pop('sentiment_bucket_entries'))
+
+
+# ─────────────────────────────────────────────
+#  IMAGE UPLOADS – validate, then orient/strip/resize off the request path
+# ─────────────────────────────────────────────
+IMAGE_FOLDERS = {'club': 'club_logos', 'profile': 'profile_pics'}
+IMAGE_DEFAULTS = {'club': 'default.svg', 'profile': 'default.jpg'}
+THUMBNAIL_SIZES = (64, 256)
+MAX_IMAGE_SIDE = 1024
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+# MPO is what Pillow calls multi-picture JPEGs from phone cameras; saved as plain JPEG
+ALLOWED_IMAGE_FORMATS = {'JPEG', 'MPO', 'PNG', 'GIF', 'WEBP', 'BMP'}
+IMAGE_COLUMNS = {'club': (Club, 'image_file'), 'profile': (User, 'profile_image')}
+THUMBNAIL_EXT = 'webp' if features.check('webp') else 'jpg'
+# Pipeline output lives in this subfolder; secure_filename() never yields a '/',
+# so older uploads can't be mistaken for it
+PROCESSED_IMAGE_DIR = 'processed'
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def thumbnail_name(filename, size):
+    return f"{os.path.splitext(filename)[0]}_{size}.{THUMBNAIL_EXT}"
+
+
+def _save_atomic(img, path, **params):
+    tmp = path + '.tmp'
+    img.save(tmp, **params)
+    os.replace(tmp, path)
+
+
+class ImagePipeline:
+    """Uploads are checked and named in the request; the heavy part (EXIF
+    orientation, metadata stripping, re-encoding and the thumbnails) runs on
+    a small thread pool after the request commits. The row only points at the
+    new file once it has been written, so a failed upload leaves the previous
+    image in place.
+
+    Files are named after a hash of their content (under PROCESSED_IMAGE_DIR),
+    so two students uploading `download.jpg` never collide and re-uploads are free.
+    """
+
+    def __init__(self, workers=2):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='images')
+        self._lock = threading.Lock()
+        self._ready = set()      # (kind, filename) known to be fully processed
+
+    def folder(self, kind):
+        return os.path.join(app.root_path, 'static', IMAGE_FOLDERS[kind])
+
+    def accept(self, file_storage, kind, row):
+        """Validate an upload for `row` (a Club or User in the current session).
+
+        Content processed before is assigned right away; anything else is
+        processed once the session commits and the row updated when done.
+        """
+        data = file_storage.read(MAX_UPLOAD_BYTES + 1)
+        filename = self.validate(data)
+        model, column = IMAGE_COLUMNS[kind]
+        if self.is_ready(kind, filename):
+            setattr(row, column, filename)
+        else:
+            on_commit(db.session, lambda: self._pool.submit(
+                self._process, data, kind, filename, inspect(row).identity[0]))
+        return filename
+
+    @staticmethod
+    def validate(data):
+        """Content-hashed filename for raw image bytes, or InvalidImage."""
+        if len(data) > MAX_UPLOAD_BYTES:
+            raise InvalidImage('Image is too large (max 10 MB).')
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                fmt = img.format
+                img.verify()
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+            raise InvalidImage('That file is not a valid image.')
+        if fmt not in ALLOWED_IMAGE_FORMATS:
+            raise InvalidImage(f'Unsupported image format {fmt}.')
+        with Image.open(io.BytesIO(data)) as img:
+            keeps_alpha = img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info
+        return f"{PROCESSED_IMAGE_DIR}/{hashlib.sha256(data).hexdigest()[:16]}{'.png' if keeps_alpha else '.jpg'}"
+
+    def is_ready(self, kind, filename):
+        if (kind, filename) in self._ready:
+            return True
+        done = os.path.exists(os.path.join(self.folder(kind), thumbnail_name(filename, THUMBNAIL_SIZES[-1])))
+        if done:
+            with self._lock:
+                self._ready.add((kind, filename))
+        return done
+
+    def _process(self, data, kind, filename, row_id):
+        model, column = IMAGE_COLUMNS[kind]
+        try:
+            self.process(data, kind, filename)
+        except Exception:
+            app.logger.exception('Image processing failed for %s %s upload %s', kind, row_id, filename)
+            return
+        with app.app_context():
+            try:
+                db.session.execute(db.update(model).where(model.id == row_id).values({column: filename}))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                app.logger.exception('Could not point %s %s at processed image %s', kind, row_id, filename)
+            finally:
+                db.session.remove()
+
+    def process(self, data, kind, filename):
+        """Write the cleaned full-size image and its thumbnails into the kind's folder."""
+        folder = self.folder(kind)
+        os.makedirs(os.path.join(folder, PROCESSED_IMAGE_DIR), exist_ok=True)
+        with Image.open(io.BytesIO(data)) as original:
+            img = ImageOps.exif_transpose(original)
+            # Re-encoding from pixel data drops EXIF/GPS, ICC and text chunks
+            img = img.convert('RGBA' if filename.endswith('.png') else 'RGB')
+        img.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE), Image.LANCZOS)
+        if filename.endswith('.png'):
+            _save_atomic(img, os.path.join(folder, filename), format='PNG', optimize=True)
+        else:
+            _save_atomic(img, os.path.join(folder, filename), format='JPEG', quality=85, optimize=True, progressive=True)
+        for size in THUMBNAIL_SIZES:
+            thumb = img.copy()
+            thumb.thumbnail((size, size), Image.LANCZOS)
+            if THUMBNAIL_EXT == 'jpg':
+                _save_atomic(thumb.convert('RGB'), os.path.join(folder, thumbnail_name(filename, size)),
+                             format='JPEG', quality=82, optimize=True)
+            else:
+                _save_atomic(thumb, os.path.join(folder, thumbnail_name(filename, size)),
+                             format='WEBP', quality=80, method=4)
+        with self._lock:
+            self._ready.add((kind, filename))
+
+
+image_pipeline = ImagePipeline()
+
+
+def image_url(kind, filename, size=None):
+    """URL for a club logo / profile picture, at the smallest thumbnail >= `size` if one exists.
+
+    Rows only name files in PROCESSED_IMAGE_DIR once processing wrote them (and
+    their thumbnails); files from before the pipeline existed are served as they are.
+    """
+    folder = IMAGE_FOLDERS[kind]
+    filename = filename or IMAGE_DEFAULTS[kind]
+    if size and filename.startswith(PROCESSED_IMAGE_DIR + '/'):
+        fitting = [s for s in THUMBNAIL_SIZES if s >= size]
+        if fitting:
+            return url_for('static', filename=f'{folder}/{thumbnail_name(filename, fitting[0])}')
+    return url_for('static', filename=f'{folder}/{filename}')
+
+
+# ─────────────────────────────────────────────
+#  PORTFOLIOS – PDFs cached on disk per content fingerprint
+# ─────────────────────────────────────────────
+PORTFOLIO_DIR = os.path.join(app.instance_path, 'portfolios')
+
+
+def portfolio_data(users):
+    """{user_id: dict of everything the portfolio PDF shows} in four queries for any number of users."""
+    preload_badges(users)
+    preload_skill_stats(users)
+    ids = [u.id for u in users]
+    clubs = {uid: [] for uid in ids}
+    for user_id, name, category in (db.session.query(UserClub.user_id, Club.name, Club.category)
+                                    .join(Club, Club.id == UserClub.club_id)
+                                    .filter(UserClub.user_id.in_(ids), UserClub.status == 'approved')
+                                    .order_by(UserClub.id)):
+        clubs[user_id].append((name, category))
+    data = {}
+    for user in users:
+        level = user.level_info
+        data[user.id] = {
+            'username': user.username,
+            'email': user.email,
+            'college': user.college,
+            'level': level['level'],
+            'level_name': level['name'],
+            'skills': sorted(user.get_skill_stats().items(), key=lambda item: (-item[1], item[0])),
+            'badges': [(b, BADGE_DEFINITIONS.get(b, {}).get('rarity', 'Common')) for b in user.badge_list],
+            'clubs': clubs[user.id],
+        }
+    return data
+
+
+def portfolio_path(user_id, fp):
+    return os.path.join(PORTFOLIO_DIR, f'{user_id}-{fp}.pdf')
+
+
+def prune_portfolios(user_id, keep_fp):
+    """Drop the user's cached PDFs other than `keep_fp`'s (files still open elsewhere stay)."""
+    keep = os.path.basename(portfolio_path(user_id, keep_fp))
+    for name in os.listdir(PORTFOLIO_DIR):
+        if name.startswith(f'{user_id}-') and name.endswith('.pdf') and name != keep:
+            try:
+                os.remove(os.path.join(PORTFOLIO_DIR, name))
+            except OSError:
+                pass
+
+
+def store_portfolio(user_id, fp, pdf_bytes, prune=True):
+    """Write a rendered PDF into the cache and (unless `prune=False`) drop the user's older versions."""
+    os.makedirs(PORTFOLIO_DIR, exist_ok=True)
+    path = portfolio_path(user_id, fp)
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(pdf_bytes)
+    os.replace(tmp, path)
+    if prune:
+        prune_portfolios(user_id, fp)
+    return path
+
+
+def open_portfolio(user):
+    """(open file, fingerprint) of `user`'s portfolio, rendering it only when its content changed.
+
+    The file is opened before anything is pruned. A concurrent request that
+    renders a newer version can only unlink it while it is already open, and
+    the response keeps reading it. The caller prunes older versions after
+    opening.
+    """
+    while True:
+        data = portfolio_data([user])[user.id]
+        fp = portfolio_fingerprint(data)
+        path = portfolio_path(user.id, fp)
+        if not os.path.exists(path):
+            store_portfolio(user.id, fp, render_portfolio(data), prune=False)
+        try:
+            return open(path, 'rb'), fp
+        except FileNotFoundError:
+            continue   # pruned by a request that saw newer data: fingerprint again
+
+
+def portfolio_filename(username):
+    return f"{secure_filename(username) or 'student'}_Portfolio.pdf"
+
+
+def portfolio_filenames(users):
+    """{user_id: export file name}, suffixing the user id (then a counter) where names collide."""
+    names, taken = {}, set()
+    for user in users:
+        name = portfolio_filename(user.username)
+        suffix, n = f"_{user.id}", 1
+        while name in taken:
+            name = portfolio_filename(f"{user.username}{suffix}")
+            n += 1
+            suffix = f"_{user.id}_{n}"
+        taken.add(name)
+        names[user.id] = name
+    return names
+
+
+def _split_stale_portfolios(users):
+    """([(user_id, path)] already cached, [(user_id, fp, data)] needing a render)."""
+    fresh, stale = [], []
+    for user_id, data in portfolio_data(users).items():
+        fp = portfolio_fingerprint(data)
+        path = portfolio_path(user_id, fp)
+        if os.path.exists(path):
+            fresh.append((user_id, path))
+        else:
+            stale.append((user_id, fp, data))
+    return fresh, stale
+
+
+def _render_in_processes(stale, processes=None):
+    """Yield (user_id, path, pdf_bytes) as worker processes finish, storing each in
+    the cache; at most a few renders per worker are in flight at once."""
+    if not stale:
+        return
+    window = 4 * (processes or os.cpu_count() or 1)
+    with ProcessPoolExecutor(processes) as pool:
+        pending = deque()
+        for i, (user_id, fp, data) in enumerate(stale):
+            pending.append((user_id, fp, pool.submit(render_portfolio, data)))
+            while pending and (len(pending) >= window or i == len(stale) - 1):
+                user_id, fp, future = pending.popleft()
+                pdf_bytes = future.result()
+                yield user_id, store_portfolio(user_id, fp, pdf_bytes), pdf_bytes
+
+
+def build_portfolios(users, processes=None):
+    """Make sure every user in `users` has an up-to-date cached PDF; stale ones are
+    rendered on a process pool. Returns {user_id: path}."""
+    fresh, stale = _split_stale_portfolios(users)
+    paths = dict(fresh)
+    for user_id, path, _ in _render_in_processes(stale, processes):
+        paths[user_id] = path
+    return paths
+
+
+def write_portfolio_zip(users, fileobj, processes=None):
+    """Stream every user's portfolio into a zip written to `fileobj` (path or file,
+    seekable or not). Cached PDFs are copied from disk, the rest are added as
+    the worker processes render them. Returns the number of PDFs written."""
+    arcnames = portfolio_filenames(users)
+    fresh, stale = _split_stale_portfolios(users)
+    written = 0
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for user_id, path in fresh:
+            zf.write(path, arcnames[user_id])
+            written += 1
+        for user_id, _, pdf_bytes in _render_in_processes(stale, processes):
+            zf.writestr(arcnames[user_id], pdf_bytes)
+            written += 1
+    return written
+
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -336,16 +2515,19 @@ def load_user(user_id):
 # ─────────────────────────────────────────────
 #  CONTEXT PROCESSOR – inject into all templates
 # ─────────────────────────────────────────────
+@app.before_request
+def _start_background_workers():
+    # Once per process, so feedback left pending by a restart is scored without
+    # waiting for new submissions
+    sentiment_worker.start()
+
+
 @app.context_processor
 def inject_globals():
-    stats = {
-        'total_students': User.query.count(),
-        'total_clubs': Club.query.count(),
-        'total_events': Event.query.count(),
-    }
     return dict(
-        global_stats=stats,
+        global_stats=global_counters.snapshot(),
         badge_defs=BADGE_DEFINITIONS,
+        image_url=image_url,
         now=datetime.utcnow(),
     )
 
@@ -355,10 +2537,13 @@ def inject_globals():
 # ─────────────────────────────────────────────
 @app.route('/')
 def home():
-    clubs = Club.query.all()
-    events = Event.query.order_by(Event.event_date.asc()).all()
-    top_users = User.query.order_by(User.xp.desc()).limit(5).all()
-    return render_template('home.html', clubs=clubs, events=events, top_users=top_users)
+    clubs, next_club_cursor = club_feed_page()
+    events, next_event_cursor = event_feed_page('upcoming')
+    preload_club_stats(clubs)
+    preload_event_stats(events, current_user)
+    top_users = [user for _, user, _ in ranked_users(xp_rank_index.top(5))]
+    return render_template('home.html', clubs=clubs, events=events, top_users=top_users,
+                           next_club_cursor=next_club_cursor, next_event_cursor=next_event_cursor)
 
 
 @app.route('/register', methods=['GET', 'POST'])
@@ -418,18 +2603,19 @@ def create_club():
         description = request.form.get('description')
         category = request.form.get('category', 'General')
         image_file = 'default.svg'
+        club = Club(name=name, description=description, category=category, image_file=image_file, manager=current_user)
         if 'logo' in request.files:
             file = request.files['logo']
             if file and file.filename != '':
-                filename = secure_filename(file.filename)
-                file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                image_file = filename
-        club = Club(name=name, description=description, category=category, image_file=image_file, manager=current_user)
+                try:
+                    image_pipeline.accept(file, 'club', club)
+                except InvalidImage as e:
+                    flash(f'{e} Using the default logo.', 'warning')
         try:
-            leveled = current_user.add_xp(50)
-            current_user.add_badge('Club Leader')
+            leveled = current_user.add_xp(50, source='club_created')
             current_user.update_streak()
             db.session.add(club)
+            record_activity(current_user, 'clubs_created')
             db.session.commit()
             msg = 'Club created! +50 XP & "Club Leader" badge! 🎉'
             if leveled:
@@ -461,7 +2647,7 @@ def create_event():
                       event_date=event_date, difficulty=difficulty, xp_reward=xp_reward,
                       registration_fee=registration_fee, upi_id=upi_id, creator_id=current_user.id)
         try:
-            current_user.add_xp(20)
+            current_user.add_xp(20, source='event_created')
             current_user.update_streak()
             db.session.add(event)
             db.session.commit()
@@ -487,6 +2673,8 @@ def club_details(club_id):
             membership = UserClub.query.filter_by(user_id=current_user.id, club_id=club.id).first()
             if membership:
                 membership_status = membership.status
+    preload_club_stats([club])
+    preload_event_stats(club.events, current_user)
     return render_template('club_details.html', club=club, membership_status=membership_status)
 
 
@@ -501,20 +2689,17 @@ def join_club_action(club_id):
     if existing:
         flash('You are already a member or have a pending request.', 'info')
     else:
-        # Check if first club BEFORE adding the new membership to session
-        club_count = UserClub.query.filter_by(user_id=current_user.id, status='approved').count()
-        
         membership = UserClub(user_id=current_user.id, club_id=club.id, status='approved')
         db.session.add(membership)
         
-        if club_count == 0:
-            current_user.add_badge('First Club Joined')
-        
-        leveled = current_user.add_xp(25)
+        leveled = current_user.add_xp(25, source='club_joined')
         current_user.update_streak()
+        new_badges = record_activity(current_user, 'clubs_joined')
         club.popularity_score += 1
         db.session.commit()
         msg = f'Joined {club.name}! +25 XP 🎉'
+        if new_badges:
+            msg += f' 🏅 New badge: {", ".join(new_badges)}'
         if leveled:
             msg += ' 🆙 Level Up!'
         flash(msg, 'success')
@@ -570,6 +2755,8 @@ def delete_club(club_id):
     
     # 6. Delete Memberships
     UserClub.query.filter_by(club_id=club.id).delete()
+    ClubSimilarity.query.filter((ClubSimilarity.club_id == club.id) |
+                                (ClubSimilarity.similar_club_id == club.id)).delete()
     
     # 7. Delete the Club itself
     db.session.delete(club)
@@ -611,25 +2798,20 @@ def join_event(event_id):
         flash('Already registered for this event!', 'info')
         return redirect(request.referrer or url_for('home'))
     
-    reg_count = EventRegistration.query.filter_by(user_id=current_user.id).count()
-    
     try:
         registration = EventRegistration(user_id=current_user.id, event_id=event.id, transaction_id=transaction_id)
         db.session.add(registration)
         
         xp = event.xp_reward
-        leveled = current_user.add_xp(xp)
+        leveled = current_user.add_xp(xp, source='event_registration')
         current_user.participation_score += 1
         current_user.update_streak()
-        
-        # Badge checks
-        if reg_count == 0:
-            current_user.add_badge('Newbie')
-        if reg_count + 1 >= 5:
-            current_user.add_badge('Social Butterfly')
+        new_badges = record_activity(current_user, 'events_registered')
         
         db.session.commit()
         msg = f'Registered for {event.title}! +{xp} XP ⚡'
+        if new_badges:
+            msg += f' 🏅 New badge: {", ".join(new_badges)}'
         if leveled:
             msg += ' 🆙 Level Up!'
         flash(msg, 'success')
@@ -674,15 +2856,10 @@ def profile():
         if 'picture' in request.files:
             file = request.files['picture']
             if file and file.filename != '':
-                filename = secure_filename(file.filename)
-                # Ensure directory exists
-                pic_path = os.path.join(app.root_path, 'static/profile_pics')
-                if not os.path.exists(pic_path):
-                    os.makedirs(pic_path)
-                
-                # Save
-                file.save(os.path.join(pic_path, filename))
-                current_user.profile_image = filename
+                try:
+                    image_pipeline.accept(file, 'profile', current_user)
+                except InvalidImage as e:
+                    flash(str(e), 'error')
                 
         if 'add_skill' in request.form:
              try:
@@ -699,7 +2876,7 @@ def profile():
                              added_count += 1
                  
                  if added_count > 0:
-                     leveled = current_user.add_xp(10 * added_count)
+                     leveled = current_user.add_xp(10 * added_count, source='skills_added')
                      current_user.update_streak()
                      db.session.commit()
                      msg = f'{added_count} skills added! +{10 * added_count} XP 🧠'
@@ -743,59 +2920,13 @@ def profile():
             db.session.remove()
             flash(f'Error updating profile: {e}', 'error')
 
-    # Track activity
+    # Track activity (writes only on the first visit of the day)
     current_user.update_streak()
+    db.session.commit()
     
     # AI Recommendations
-    recommended_clubs = []
-    user_hobbies = []
-    if current_user.hobbies:
-        user_hobbies = [h.strip() for h in current_user.hobbies.split(',')]
-    
-    if user_hobbies:
-        all_clubs = Club.query.all()
-        
-        # Exclude clubs the user already joined or manages
-        joined_club_ids = {uc.club_id for uc in UserClub.query.filter_by(user_id=current_user.id).all()}
-        managed_club_ids = {c.id for c in Club.query.filter_by(manager_id=current_user.id).all()}
-        exclude_ids = joined_club_ids | managed_club_ids
-        
-        # Interest -> Keywords mapping
-        interest_map = {
-            'Coding': ['tech', 'code', 'develop', 'hack', 'programming', 'software'],
-            'Design': ['art', 'design', 'creative', 'paint', 'ui', 'ux', 'graphic'],
-            'Public Speaking': ['debate', 'speak', 'toastmaster', 'orator', 'speech'],
-            'Leadership': ['lead', 'manage', 'council', 'entrepreneur', 'business'],
-            'Music': ['music', 'band', 'sing', 'instrument', 'jam'],
-            'Photography': ['photo', 'camera', 'media', 'film', 'lens'],
-            'Gaming': ['game', 'esport', 'play station', 'pc'],
-            'Social Service': ['social', 'service', 'ngo', 'help', 'volunteer', 'nss']
-        }
-
-        for club in all_clubs:
-            if club.id in exclude_ids:
-                continue
-            match_score = 0
-            # text search
-            club_text = (club.name + " " + club.description + " " + (club.category or "")).lower()
-            
-            for hobby in user_hobbies:
-                # Direct match
-                if hobby.lower() in club_text:
-                    match_score += 20
-                
-                # Semantic match via mapping (case-insensitive lookup)
-                keywords = interest_map.get(hobby.strip().title(), [])
-                for kw in keywords:
-                    if kw in club_text:
-                        match_score += 15
-                        break # count once per hobby
-
-            if match_score > 0:
-                club.match_percentage = min(match_score + 40, 98)
-                recommended_clubs.append(club)
-    
-    recommended_clubs.sort(key=lambda x: x.match_percentage, reverse=True)
+    recommended_clubs = recommend_clubs_for(current_user)
+    user_hobbies = [h.strip() for h in current_user.hobbies.split(',')] if current_user.hobbies else []
 
     # Profile Completion
     completion_score = 0
@@ -805,46 +2936,14 @@ def profile():
     if current_user.hobbies: completion_score += 25
 
     # Streak heatmap data (last 90 days)
-    heatmap_data = {}
-    regs = EventRegistration.query.filter_by(user_id=current_user.id).all()
-    for r in regs:
-        day_key = r.registered_at.strftime('%Y-%m-%d')
-        heatmap_data[day_key] = heatmap_data.get(day_key, 0) + 1
-
-    # Retroactive badge checks — award any badges the user should have
-    badge_dirty = False
-    approved_clubs = UserClub.query.filter_by(user_id=current_user.id, status='approved').count()
-    if approved_clubs >= 1 and 'First Club Joined' not in current_user.badge_list:
-        current_user.add_badge('First Club Joined'); badge_dirty = True
-
-    reg_count = EventRegistration.query.filter_by(user_id=current_user.id).count()
-    if reg_count >= 1 and 'Newbie' not in current_user.badge_list:
-        current_user.add_badge('Newbie'); badge_dirty = True
-    if reg_count >= 5 and 'Social Butterfly' not in current_user.badge_list:
-        current_user.add_badge('Social Butterfly'); badge_dirty = True
-
-    fb_count = Feedback.query.filter_by(user_id=current_user.id).count()
-    if fb_count >= 5 and 'Feedback Guru' not in current_user.badge_list:
-        current_user.add_badge('Feedback Guru'); badge_dirty = True
-
-    if current_user.streak_count >= 7 and 'Streak 7' not in current_user.badge_list:
-        current_user.add_badge('Streak 7'); badge_dirty = True
-
-    managed = Club.query.filter_by(manager_id=current_user.id).count()
-    if managed >= 1 and 'Club Leader' not in current_user.badge_list:
-        current_user.add_badge('Club Leader'); badge_dirty = True
-
-    if badge_dirty:
-        db.session.commit()
+    heatmap_data = activity_heatmap(current_user.id)
 
     # Achievements
     achievements = []
+    earned_pcts = badge_stats.earned_percentages()
     for badge_name, info in BADGE_DEFINITIONS.items():
-        earned = badge_name in current_user.badge_list
-        # Calculate how many users earned it
-        total_users = User.query.count()
-        earned_count = User.query.filter(User.badges.contains(badge_name)).count()
-        pct = int((earned_count / total_users) * 100) if total_users > 0 else 0
+        earned = current_user.has_badge(badge_name)
+        pct = earned_pcts[badge_name]
         achievements.append({
             'name': badge_name, 'icon': info['icon'], 'desc': info['desc'],
             'rarity': info['rarity'], 'earned': earned, 'earned_pct': pct
@@ -865,78 +2964,34 @@ def profile():
 @app.route('/portfolio/download')
 @login_required
 def generate_portfolio():
-    from fpdf import FPDF
-    
-    class PDF(FPDF):
-        def header(self):
-            self.set_font('Arial', 'B', 15)
-            self.cell(80)
-            self.cell(30, 10, 'CampusConnect Impact Report', 0, 0, 'C')
-            self.ln(20)
-
-        def footer(self):
-            self.set_y(-15)
-            self.set_font('Arial', 'I', 8)
-            self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'C')
-
-    pdf = PDF()
-    pdf.add_page()
-    
-    # Title & User Info
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt=f"Student Profile: {current_user.username}", ln=True)
-    pdf.cell(200, 10, txt=f"Email: {current_user.email}", ln=True)
-    pdf.cell(200, 10, txt=f"College: {current_user.college or 'N/A'}", ln=True)
-    pdf.cell(200, 10, txt=f"Level: {current_user.level_info['level']} ({current_user.level_info['name']})", ln=True)
-    pdf.ln(10)
-
-    # Skills
-    pdf.set_font("Arial", 'B', 14)
-    pdf.cell(200, 10, txt="Skill Profile", ln=True)
-    pdf.set_font("Arial", size=12)
-    skills = current_user.get_skill_stats()
-    if skills:
-        for s, pts in skills.items():
-            pdf.cell(200, 8, txt=f"- {s}: {pts} Points", ln=True)
-    else:
-        pdf.cell(200, 8, txt="No skills detected yet.", ln=True)
-    pdf.ln(10)
-
-    # Badges
-    pdf.set_font("Arial", 'B', 14)
-    pdf.cell(200, 10, txt="Achievements & Badges", ln=True)
-    pdf.set_font("Arial", size=12)
-    badges = current_user.badge_list
-    if badges:
-        for b in badges:
-            info = BADGE_DEFINITIONS.get(b, {})
-            pdf.cell(200, 8, txt=f"- {info.get('icon','')} {b} ({info.get('rarity','Common')})", ln=True)
-    else:
-        pdf.cell(200, 8, txt="No badges earned yet.", ln=True)
-    pdf.ln(10)
-
-    # Club Participation
-    pdf.set_font("Arial", 'B', 14)
-    pdf.cell(200, 10, txt="Club Memberships", ln=True)
-    pdf.set_font("Arial", size=12)
-    for uc in current_user.clubs_joined:
-        if uc.status == 'approved':
-             pdf.cell(200, 8, txt=f"- {uc.club.name} ({uc.club.category})", ln=True)
-    
-    response = make_response(pdf.output(dest='S').encode('latin-1'))
-    response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = f'attachment; filename={current_user.username}_Portfolio.pdf'
+    pdf, fp = open_portfolio(current_user)
+    stat = os.fstat(pdf.fileno())
+    response = send_file(pdf, mimetype='application/pdf', as_attachment=True,
+                         download_name=f'{current_user.username}_Portfolio.pdf',
+                         etag=fp, conditional=False, max_age=0, last_modified=stat.st_mtime)
+    # send_file only knows the size (needed for Range) of paths, not open files
+    response.make_conditional(request, accept_ranges=True, complete_length=stat.st_size)
+    response.cache_control.private = True
+    prune_portfolios(current_user.id, fp)
     return response
 
 
-
-
 @app.route('/leaderboard')
 def leaderboard():
-    users = User.query.order_by(User.xp.desc()).limit(20).all()
+    period = request.args.get('period', 'all')
+    if period not in LEADERBOARD_PERIODS:
+        period = 'all'
+    college = request.args.get('college') or None
+    ranked = ranked_users(period_leaderboard(period, college, limit=20))
+    preload_badges([user for _, user, _ in ranked])
+    my_neighbors = []
+    if current_user.is_authenticated and period == 'all' and not college:
+        my_neighbors = ranked_users(xp_rank_index.around(current_user.id, radius=2))
     # Top clubs
-    clubs = Club.query.order_by(Club.popularity_score.desc()).limit(10).all()
-    return render_template('leaderboard.html', users=users, clubs=clubs)
+    clubs = preload_club_stats(Club.query.order_by(Club.popularity_score.desc()).limit(10).all())
+    return render_template('leaderboard.html', ranked=ranked, clubs=clubs,
+                           my_neighbors=my_neighbors, total_ranked=xp_rank_index.total(),
+                           period=period, college=college, colleges=leaderboard_colleges())
 
 
 @app.route('/dashboard')
@@ -949,16 +3004,14 @@ def dashboard():
     
     # Club admin data
     managed_clubs = Club.query.filter_by(manager_id=current_user.id).all()
+    rollups = dashboard_club_stats(managed_clubs)
     club_analytics = []
     for club in managed_clubs:
-        total_members = club.member_count
-        total_events = len(club.events)
-        total_feedback = len(club.feedback)
-        pos = sum(1 for f in club.feedback if f.sentiment_label == 'Positive')
-        neg = sum(1 for f in club.feedback if f.sentiment_label == 'Negative')
+        stats = rollups[club.id]
         club_analytics.append({
-            'club': club, 'members': total_members, 'events': total_events,
-            'feedback': total_feedback, 'positive': pos, 'negative': neg,
+            'club': club, 'members': stats.members, 'events': stats.events,
+            'feedback': stats.feedback, 'positive': stats.positive, 'negative': stats.negative,
+            'mean_sentiment': stats.mean_sentiment, 'trend': stats.trend, 'recent': stats.recent_count,
         })
 
     return render_template('dashboard.html',
@@ -974,29 +3027,20 @@ def submit_feedback(club_id):
     club = Club.query.get_or_404(club_id)
     content = request.form.get('content')
     if content:
-        blob = TextBlob(content)
-        sentiment_score = blob.sentiment.polarity
-        if sentiment_score > 0.1:
-            label = "Positive"
-        elif sentiment_score < -0.1:
-            label = "Negative"
-        else:
-            label = "Neutral"
         try:
-            feedback = Feedback(content=content, sentiment_score=sentiment_score,
-                                sentiment_label=label, club_id=club_id, user_id=current_user.id)
+            # Scored shortly after commit by sentiment_worker
+            feedback = Feedback(content=content, sentiment_score=0.0,
+                                sentiment_label=SENTIMENT_PENDING, club_id=club_id, user_id=current_user.id)
             db.session.add(feedback)
             
-            leveled = current_user.add_xp(10)
+            leveled = current_user.add_xp(10, source='feedback')
             current_user.update_streak()
-            
-            # Badge: Feedback Guru
-            fb_count = Feedback.query.filter_by(user_id=current_user.id).count()
-            if fb_count >= 4:
-                current_user.add_badge('Feedback Guru')
+            new_badges = record_activity(current_user, 'feedback_submitted')
             
             db.session.commit()
             msg = 'Feedback submitted! +10 XP 📝'
+            if new_badges:
+                msg += f' 🏅 New badge: {", ".join(new_badges)}'
             if leveled:
                 msg += ' 🆙 Level Up!'
             flash(msg, 'success')
@@ -1012,10 +3056,112 @@ def submit_feedback(club_id):
 # ─────────────────────────────────────────────
 @app.route('/api/stats')
 def api_stats():
+    stats = global_counters.snapshot()
+    return jsonify({
+        'students': stats['total_students'],
+        'clubs': stats['total_clubs'],
+        'events': stats['total_events'],
+    })
+
+
+@app.route('/api/leaderboard')
+def api_leaderboard():
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    period = request.args.get('period', 'all')
+    if period not in LEADERBOARD_PERIODS:
+        return jsonify({'error': f'period must be one of {sorted(LEADERBOARD_PERIODS)}'}), 400
+    college = request.args.get('college') or None
+    if period == 'all' and not college:
+        offset = max(0, request.args.get('offset', 0, type=int))
+        entries = xp_rank_index.top(limit, offset)
+    else:
+        entries = period_leaderboard(period, college, limit)
+    return jsonify({
+        'period': period,
+        'college': college,
+        'total': period_leaderboard_total(period, college),
+        'entries': [rank_entry_to_dict(*entry) for entry in ranked_users(entries)],
+    })
+
+
+@app.route('/api/leaderboard/me')
+@login_required
+def api_leaderboard_me():
+    radius = max(0, min(request.args.get('radius', 2, type=int), 25))
+    return jsonify({
+        'rank': xp_rank_index.rank(current_user.id),
+        'total': xp_rank_index.total(),
+        'xp': current_user.xp,
+        'neighbors': [rank_entry_to_dict(*entry)
+                      for entry in ranked_users(xp_rank_index.around(current_user.id, radius))],
+    })
+
+
+@app.route('/api/recommendations')
+@login_required
+def api_recommendations():
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    return jsonify([{
+        'id': club.id,
+        'name': club.name,
+        'category': club.category or 'General',
+        'description': club.description,
+        'image': image_url('club', club.image_file, 256),
+        'match': club.match_percentage,
+        'url': url_for('club_details', club_id=club.id),
+    } for club in recommend_clubs_for(current_user, limit)])
+
+
+@app.route('/api/activity')
+@login_required
+def api_activity():
+    """Heatmap data for the current user; ?days=365 for the yearly view."""
+    days = request.args.get('days', ACTIVITY_WINDOWS[0], type=int)
+    if days not in ACTIVITY_WINDOWS:
+        days = ACTIVITY_WINDOWS[0]
+    return jsonify({'days': days, 'activity': activity_heatmap(current_user.id, days)})
+
+
+@app.route('/api/club/<int:club_id>/sentiment')
+@login_required
+def api_club_sentiment(club_id):
+    club = Club.query.get_or_404(club_id)
+    if club.manager_id != current_user.id:
+        return jsonify({'error': 'Only the club manager can view feedback analytics'}), 403
+    granularity = request.args.get('granularity', 'week')
+    if granularity not in ('day', 'week'):
+        return jsonify({'error': 'granularity must be day or week'}), 400
+    days = max(1, min(request.args.get('days', 365, type=int), 3650))
+    return jsonify(sentiment_series(club.id, granularity, days))
+
+
+@app.route('/api/feed/events/<stream>')
+def api_feed_events(stream):
+    if stream not in ('upcoming', 'past'):
+        abort(404)
+    try:
+        events, next_cursor = event_feed_page(stream, request.args.get('cursor'))
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    preload_event_stats(events, current_user)
+    return jsonify({
+        'html': render_template('_event_cards.html', events=events),
+        'ids': [e.id for e in events],
+        'next_cursor': next_cursor,
+    })
+
+
+@app.route('/api/feed/clubs')
+def api_feed_clubs():
+    try:
+        clubs, next_cursor = club_feed_page(request.args.get('cursor'))
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    preload_club_stats(clubs)
     return jsonify({
-        'students': User.query.count(),
-        'clubs': Club.query.count(),
-        'events': Event.query.count(),
+        'html': render_template('_club_cards.html', clubs=clubs),
+        'ids': [c.id for c in clubs],
+        'next_cursor': next_cursor,
     })
 
 
@@ -1035,22 +3181,107 @@ def chat_messages(club_id):
         message = Message(content=content, user_id=current_user.id, club_id=club_id)
         db.session.add(message)
         db.session.commit()
-        return jsonify({
-            'id': message.id,
-            'content': message.content,
-            'username': current_user.username,
-            'timestamp': message.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-            'is_pinned': message.is_pinned
-        })
-    
-    messages = Message.query.filter_by(club_id=club_id).order_by(Message.timestamp.asc()).all()
-    return jsonify([{
-        'id': m.id,
-        'content': m.content,
-        'username': m.user.username,
-        'timestamp': m.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-        'is_pinned': m.is_pinned
-    } for m in messages])
+        payload = message_to_dict(message)
+        chat_broker.publish(club_id, 'message', payload)
+        return jsonify(payload)
+
+    # ?after_id=N -> only newer messages (add &wait=S to long-poll for them)
+    # ?before_id=N -> the page of older messages, for scrolling back
+    after_id = request.args.get('after_id', type=int)
+    before_id = request.args.get('before_id', type=int)
+    limit = max(1, min(request.args.get('limit', CHAT_PAGE_SIZE, type=int), CHAT_PAGE_SIZE * 4))
+    wait = max(0.0, min(request.args.get('wait', 0, type=float), CHAT_LONG_POLL_MAX))
+
+    if after_id is None or wait <= 0:
+        messages = chat_history_page(club_id, after_id, before_id, limit)
+        return jsonify([message_to_dict(m) for m in messages])
+
+    # Subscribe before reading so a message committed in between isn't missed
+    with chat_broker.subscribe(club_id) as sub:
+        messages = chat_history_page(club_id, after_id, None, limit)
+        if messages:
+            return jsonify([message_to_dict(m) for m in messages])
+        # Hand the connection back so a parked reader doesn't hold SQLite's read lock
+        db.session.close()
+        deadline = time.monotonic() + wait
+        while True:
+            remaining = deadline - time.monotonic()
+            item = sub.get(remaining) if remaining > 0 else None
+            if item is None:
+                break
+            kind, data = item
+            # Events are only a wake-up: concurrent posts can publish out of id
+            # order, but ids are assigned in commit order, so the table is complete
+            if kind in ('reset', 'message'):
+                messages = chat_history_page(club_id, after_id, None, limit)
+                if messages:
+                    return jsonify([message_to_dict(m) for m in messages])
+                db.session.close()
+    return jsonify([])
+
+
+@app.route('/api/club/<int:club_id>/stream')
+@login_required
+def chat_stream(club_id):
+    """Server-Sent Events feed of new messages and pin changes for one club."""
+    club = Club.query.get_or_404(club_id)
+    membership = UserClub.query.filter_by(user_id=current_user.id, club_id=club_id).first()
+    if club.manager_id != current_user.id and (not membership or membership.status != 'approved'):
+        return jsonify({'error': 'Membership required to access chat'}), 403
+
+    # EventSource sends Last-Event-ID on reconnect; the first connect passes ?after_id
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    if last_id is None:
+        last_id = request.args.get('after_id', type=int)
+
+    def sse(kind, data, event_id=None):
+        head = f"id: {event_id}\n" if event_id is not None else ''
+        return f"{head}event: {kind}\ndata: {json.dumps(data)}\n\n"
+
+    def newer_than(after_id):
+        """Committed messages after `after_id`, oldest first, one page at a time."""
+        while True:
+            page = [message_to_dict(m) for m in chat_history_page(club_id, after_id, None, CHAT_PAGE_SIZE * 4)]
+            db.session.close()   # don't hold SQLite's read lock while parked
+            if not page:
+                return
+            yield from page
+            after_id = page[-1]['id']
+
+    def generate():
+        # Subscribed only once the response is iterated, and always removed on the
+        # way out; subscribing before reading the table means nothing falls between
+        with chat_broker.subscribe(club_id) as sub:
+            sent_id = last_id
+            if sent_id is None:   # first connect without a cursor: only what's new from here on
+                sent_id = db.session.query(db.func.max(Message.id)).filter(Message.club_id == club_id).scalar() or 0
+            yield "retry: 3000\n\n"
+            for data in newer_than(sent_id):
+                sent_id = data['id']
+                yield sse('message', data, data['id'])
+            while True:
+                item = sub.get(CHAT_STREAM_KEEPALIVE)
+                if item is None:
+                    yield ": keepalive\n\n"
+                    continue
+                kind, data = item
+                if kind == 'reset':
+                    # Fell behind: end the stream, the browser reconnects with Last-Event-ID
+                    yield sse('reset', {})
+                    return
+                if kind == 'message':
+                    # Only a wake-up: concurrent posts can publish out of id order, but
+                    # ids are assigned in commit order, so the table has every one
+                    for row in newer_than(sent_id):
+                        sent_id = row['id']
+                        yield sse(kind, row, row['id'])
+                else:
+                    yield sse(kind, data)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 
 
@@ -1064,7 +3295,9 @@ def toggle_pin(message_id):
     
     message.is_pinned = not message.is_pinned
     db.session.commit()
-    return jsonify({'id': message.id, 'is_pinned': message.is_pinned})
+    payload = {'id': message.id, 'is_pinned': message.is_pinned}
+    chat_broker.publish(message.club_id, 'pin', payload)
+    return jsonify(payload)
 
 
 @app.route('/api/club/<int:club_id>/pinned', methods=['GET'])
@@ -1075,7 +3308,7 @@ def get_pinned_messages(club_id):
     if club.manager_id != current_user.id and (not membership or membership.status != 'approved'):
         return jsonify({'error': 'Membership required to view pinned messages'}), 403
 
-    messages = Message.query.filter_by(club_id=club_id, is_pinned=True).order_by(Message.timestamp.desc()).all()
+    messages = Message.query.options(joinedload(Message.user)).filter_by(club_id=club_id, is_pinned=True).order_by(Message.timestamp.desc()).all()
     return jsonify([{
         'id': m.id,
         'content': m.content,
@@ -1089,5 +3322,6 @@ def get_pinned_messages(club_id):
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+    sentiment_service.warm()
     app.run(debug=True)
 
@@ -5,23 +5,23 @@ def assign_badges():
         # 1. Ishaan Joshi
         ishaan = User.query.filter_by(username="Ishaan Joshi").first()
         if ishaan:
-            ishaan.badges = "Campus Legend,Code Ninja,Hackathon Winner"
+            ishaan.set_badges(["Campus Legend", "Code Ninja", "Hackathon Winner"])
             ishaan.xp = 3500
-            print(f"Updated Ishaan: {ishaan.badges}")
+            print(f"Updated Ishaan: {ishaan.badge_list}")
 
         # 2. Krishna Das
         krishna = User.query.filter_by(username="Krishna Das").first()
         if krishna:
-            krishna.badges = "Club Leader,Event Speaker,Visionary"
+            krishna.set_badges(["Club Leader", "Event Speaker", "Visionary"])
             krishna.xp = 2800
-            print(f"Updated Krishna: {krishna.badges}")
+            print(f"Updated Krishna: {krishna.badge_list}")
 
         # 3. Aarav Patel
         aarav = User.query.filter_by(username="Aarav Patel").first()
         if aarav:
-            aarav.badges = "Social Butterfly,Networker,Volunteer Star"
+            aarav.set_badges(["Social Butterfly", "Networker", "Volunteer Star"])
             aarav.xp = 2200
-            print(f"Updated Aarav: {aarav.badges}")
+            print(f"Updated Aarav: {aarav.badge_list}")
 
         db.session.commit()
         print("✅ Badges assigned successfully!")
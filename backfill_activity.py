@@ -0,0 +1,11 @@
+from app import app, db, rebuild_activity_days
+
+def backfill_activity():
+    with app.app_context():
+        db.create_all()
+        print("📅 Rebuilding daily activity from event registrations, feedback and chat...")
+        rows = rebuild_activity_days()
+        print(f"✅ Activity heatmap rebuilt ({rows} user-days).")
+
+if __name__ == "__main__":
+    backfill_activity()
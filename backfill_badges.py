@@ -0,0 +1,11 @@
+from app import app, db, rebuild_badge_counters
+
+def backfill_badges():
+    with app.app_context():
+        db.create_all()
+        print("🔢 Rebuilding activity counters from clubs, events and feedback...")
+        awarded = rebuild_badge_counters()
+        print(f"✅ Counters rebuilt. {awarded} badges awarded retroactively.")
+
+if __name__ == "__main__":
+    backfill_badges()
@@ -0,0 +1,95 @@
+"""Compare query plans and timings for the hot lookups before/after migrate_db.create_indexes.
+
+Builds a throwaway SQLite file from the model metadata (tables only, no
+indexes), fills it with synthetic rows, then runs EXPLAIN QUERY PLAN and a
+timing loop for each query before and after the migration.
+
+    python bench_indexes.py [--users 2000] [--runs 200]
+"""
+import argparse, os, random, sqlite3, tempfile, time
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects import sqlite as sqlite_dialect
+from sqlalchemy.schema import CreateTable
+
+from app import db
+from migrate_db import create_indexes
+
+HOT_QUERIES = [
+    ('membership lookup', "SELECT id FROM user_club WHERE user_id = ? AND club_id = ?", lambda r: (r.randint(1, 2000), r.randint(1, 100))),
+    ('club member count', "SELECT COUNT(*) FROM user_club WHERE club_id = ? AND status = 'approved'", lambda r: (r.randint(1, 100),)),
+    ('registration lookup', "SELECT id FROM event_registration WHERE user_id = ? AND event_id = ?", lambda r: (r.randint(1, 2000), r.randint(1, 2000))),
+    ('attendee count', "SELECT COUNT(*) FROM event_registration WHERE event_id = ?", lambda r: (r.randint(1, 2000),)),
+    ('chat history', "SELECT id FROM message WHERE club_id = ? ORDER BY timestamp", lambda r: (r.randint(1, 100),)),
+    ('pinned messages', "SELECT id FROM message WHERE club_id = ? AND is_pinned = 1", lambda r: (r.randint(1, 100),)),
+    ('feedback by user', "SELECT COUNT(*) FROM feedback WHERE user_id = ?", lambda r: (r.randint(1, 2000),)),
+    ('upcoming events', "SELECT id FROM event WHERE event_date > ? ORDER BY event_date LIMIT 10", lambda r: (datetime.utcnow().isoformat(' '),)),
+]
+
+
+def build_database(path, users, clubs, events, rng):
+    conn = sqlite3.connect(path)
+    for table in db.metadata.sorted_tables:
+        conn.execute(str(CreateTable(table).compile(dialect=sqlite_dialect.dialect())))
+
+    now = datetime.utcnow()
+    conn.executemany("INSERT INTO user (id, username, email, password, xp, badges, profile_image) VALUES (?, ?, ?, 'x', ?, '', 'default.jpg')",
+                     [(i, f'user{i}', f'user{i}@example.com', rng.randint(0, 3000)) for i in range(1, users + 1)])
+    conn.executemany("INSERT INTO club (id, name, description, image_file, manager_id) VALUES (?, ?, 'd', 'default.svg', ?)",
+                     [(i, f'club{i}', rng.randint(1, users)) for i in range(1, clubs + 1)])
+    conn.executemany("INSERT INTO event (id, title, date_posted, event_date, description, club_id) VALUES (?, ?, ?, ?, 'd', ?)",
+                     [(i, f'event{i}', now, now + timedelta(days=rng.randint(-365, 60)), rng.randint(1, clubs)) for i in range(1, events + 1)])
+    pairs = {(rng.randint(1, users), rng.randint(1, clubs)) for _ in range(users * 5)}
+    conn.executemany("INSERT INTO user_club (user_id, club_id, status) VALUES (?, ?, ?)",
+                     [(u, c, rng.choice(['approved', 'approved', 'pending'])) for u, c in pairs])
+    pairs = {(rng.randint(1, users), rng.randint(1, events)) for _ in range(users * 25)}
+    conn.executemany("INSERT INTO event_registration (user_id, event_id, registered_at) VALUES (?, ?, ?)",
+                     [(u, e, now) for u, e in pairs])
+    conn.executemany("INSERT INTO message (content, timestamp, user_id, club_id, is_pinned) VALUES ('hi', ?, ?, ?, ?)",
+                     [(now - timedelta(minutes=i), rng.randint(1, users), rng.randint(1, clubs), rng.random() < 0.02) for i in range(users * 25)])
+    conn.executemany("INSERT INTO feedback (content, sentiment_score, sentiment_label, club_id, user_id, timestamp) VALUES ('ok', 0, 'Neutral', ?, ?, ?)",
+                     [(rng.randint(1, clubs), rng.randint(1, users), now) for _ in range(users * 5)])
+    conn.commit()
+    return conn
+
+
+def measure(conn, runs, seed):
+    results = {}
+    for name, sql, params in HOT_QUERIES:
+        rng = random.Random(seed)
+        plan = ' | '.join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params(rng)))
+        start = time.perf_counter()
+        for _ in range(runs):
+            conn.execute(sql, params(rng)).fetchall()
+        results[name] = (plan, (time.perf_counter() - start) / runs * 1000)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--clubs', type=int, default=100)
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--runs', type=int, default=200)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        conn = build_database(path, args.users, args.clubs, args.events, random.Random(42))
+        before = measure(conn, args.runs, seed=7)
+        create_indexes(conn)
+        after = measure(conn, args.runs, seed=7)
+        conn.close()
+    finally:
+        os.remove(path)
+
+    for name, _, _ in HOT_QUERIES:
+        (plan_before, ms_before), (plan_after, ms_after) = before[name], after[name]
+        print(f"\n{name}: {ms_before:.3f} ms -> {ms_after:.3f} ms ({ms_before / max(ms_after, 1e-9):.1f}x)")
+        print(f"  before: {plan_before}")
+        print(f"  after:  {plan_after}")
+
+
+if __name__ == '__main__':
+    main()
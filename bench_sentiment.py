@@ -0,0 +1,77 @@
+"""Compare sentiment backends: warm-up cost, throughput, LRU hit speed and label agreement.
+
+Uses the feedback already in the database plus a synthetic corpus built from
+typical club-feedback phrases (with repeats, as real feedback has).
+
+    python bench_sentiment.py [--size 2000] [--backends textblob lexicon]
+"""
+import argparse, random, time
+
+from sentiment import BACKENDS, SentimentService
+
+OPENERS = ["", "Honestly, ", "Overall ", "I think ", "Tbh "]
+SUBJECTS = ["the workshop", "this club", "the event", "the session", "the hackathon", "the speaker", "the venue"]
+VERDICTS = ["was amazing", "was great fun", "was really good", "was okay", "was not bad at all", "was boring",
+            "was very disappointing", "was terrible", "was badly organised", "was extremely helpful",
+            "could have been better", "was the best so far", "was a waste of time", "was nice"]
+CLOSERS = ["", "!", ".", " and I learned a lot.", " but it started late.", " - would join again!", " :("]
+
+
+def synthetic_corpus(size, rng):
+    return [f"{rng.choice(OPENERS)}{rng.choice(SUBJECTS)} {rng.choice(VERDICTS)}{rng.choice(CLOSERS)}".strip()
+            for _ in range(size)]
+
+
+def stored_feedback():
+    try:
+        from app import app, db, Feedback
+        with app.app_context():
+            return [content for (content,) in db.session.query(Feedback.content)]
+    except Exception as e:
+        print(f"(skipping stored feedback: {e})")
+        return []
+
+
+def bench(name, corpus):
+    service = SentimentService(name, cache_size=4096)
+    start = time.perf_counter()
+    service.warm()
+    warm_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for text in corpus:
+        service.backend.polarity(text)
+    raw = len(corpus) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    labels = [service.score(text)[1] for text in corpus]
+    cached = len(corpus) / (time.perf_counter() - start)
+    info = service.cache_info()
+    return warm_ms, raw, cached, info.hits / max(info.hits + info.misses, 1), labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=2000)
+    parser.add_argument('--backends', nargs='+', choices=sorted(BACKENDS), default=sorted(BACKENDS, reverse=True))
+    args = parser.parse_args()
+
+    corpus = stored_feedback() + synthetic_corpus(args.size, random.Random(42))
+    print(f"Corpus: {len(corpus)} strings ({len(set(corpus))} distinct)\n")
+
+    results = {}
+    for name in args.backends:
+        warm_ms, raw, cached, hit_rate, labels = bench(name, corpus)
+        results[name] = labels
+        print(f"{name:9} warm-up {warm_ms:8.1f} ms | {raw:9.0f} texts/s uncached "
+              f"| {cached:9.0f} texts/s with LRU ({hit_rate:.0%} hits)")
+
+    if len(results) > 1:
+        baseline, *others = args.backends
+        for name in others:
+            agree = sum(a == b for a, b in zip(results[baseline], results[name])) / len(corpus)
+            print(f"\nLabel agreement {name} vs {baseline}: {agree:.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Concurrent write/read benchmark for the SQLite profiles in app.SQLITE_PROFILES.
+
+Each profile gets a throwaway database built from the model metadata. Worker
+threads then run a mix of chat-style writes (insert a Message, bump the
+club's popularity in one transaction) and history reads for a fixed time.
+Reported per profile: write throughput, p50/p99 latency and how many
+operations failed with "database is locked".
+
+    python bench_sqlite.py [--threads 16] [--seconds 10] [--write-ratio 0.3]
+"""
+import argparse, os, random, tempfile, threading, time
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.exc import OperationalError
+
+from app import db, User, Club, Message, SQLITE_PROFILES, sqlite_engine_options, apply_sqlite_profile
+
+USERS, CLUBS = 200, 20
+
+
+def build_engine(path, profile):
+    engine = create_engine(f'sqlite:///{path}', **sqlite_engine_options(profile))
+    apply_sqlite_profile(engine, profile)
+    db.metadata.create_all(engine, tables=[User.__table__, Club.__table__, Message.__table__])
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'password': 'x'}
+            for i in range(1, USERS + 1)])
+        conn.execute(insert(Club.__table__), [
+            {'id': i, 'name': f'club{i}', 'description': 'd', 'manager_id': 1} for i in range(1, CLUBS + 1)])
+    return engine
+
+
+def post_message(engine, rng):
+    club_id = rng.randint(1, CLUBS)
+    with engine.begin() as conn:
+        conn.execute(insert(Message.__table__).values(content='hello ' * rng.randint(1, 20),
+                                                      user_id=rng.randint(1, USERS), club_id=club_id))
+        conn.execute(update(Club.__table__).where(Club.__table__.c.id == club_id)
+                     .values(popularity_score=Club.__table__.c.popularity_score + 1))
+
+
+def read_history(engine, rng):
+    m = Message.__table__
+    with engine.connect() as conn:
+        conn.execute(select(m.c.id, m.c.content, User.__table__.c.username)
+                     .join(User.__table__, User.__table__.c.id == m.c.user_id)
+                     .where(m.c.club_id == rng.randint(1, CLUBS))
+                     .order_by(m.c.timestamp.desc()).limit(20)).all()
+
+
+def worker(engine, seed, stop_at, write_ratio, results):
+    rng = random.Random(seed)
+    writes, reads, locked = [], [], 0
+    while time.perf_counter() < stop_at:
+        is_write = rng.random() < write_ratio
+        start = time.perf_counter()
+        try:
+            (post_message if is_write else read_history)(engine, rng)
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            locked += 1
+            continue
+        (writes if is_write else reads).append(time.perf_counter() - start)
+    results.append((writes, reads, locked))
+
+
+def percentile(samples, pct):
+    if not samples:
+        return float('nan')
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))] * 1000
+
+
+def run(profile, threads, seconds, write_ratio):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(os.path.join(tmp, 'bench.db'), profile)
+        results = []
+        stop_at = time.perf_counter() + seconds
+        pool = [threading.Thread(target=worker, args=(engine, i, stop_at, write_ratio, results)) for i in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        engine.dispose()
+    writes = [x for w, _, _ in results for x in w]
+    reads = [x for _, r, _ in results for x in r]
+    locked = sum(n for _, _, n in results)
+    print(f"{profile:11} {len(writes) / seconds:9.0f} writes/s  write p50 {percentile(writes, 50):7.2f} ms  "
+          f"p99 {percentile(writes, 99):8.2f} ms | {len(reads) / seconds:9.0f} reads/s  read p99 "
+          f"{percentile(reads, 99):8.2f} ms | {locked} locked")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--write-ratio', type=float, default=0.3)
+    parser.add_argument('--profiles', nargs='+', choices=sorted(SQLITE_PROFILES), default=['default', 'production'])
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads, {args.seconds:g}s per profile, {args.write_ratio:.0%} writes\n")
+    for profile in args.profiles:
+        run(profile, args.threads, args.seconds, args.write_ratio)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,16 @@
+from app import app, db, rebuild_club_similarity
+
+def build_club_similarity():
+    """Offline batch job: refresh the club-club similarity table used by recommendations.
+
+    Schedule alongside nightly_skill_refresh.py; running web workers pick the
+    new neighbours up within the recommender's cache TTL.
+    """
+    with app.app_context():
+        db.create_all()
+        print("🤝 Building club similarity from memberships and event registrations...")
+        rows = rebuild_club_similarity()
+        print(f"✅ Stored {rows} club neighbour pairs.")
+
+if __name__ == "__main__":
+    build_club_similarity()
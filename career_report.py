@@ -0,0 +1,115 @@
+"""Career alignment for a whole cohort in one vectorized pass (placement-cell reports).
+
+Loads the user x skill matrix from UserSkillVector and the career x skill
+requirement matrix once, then scores every user/career pair with the same
+rules as User.get_career_alignment (points capped at 50 per required skill,
+"missing" = required skills below 10 points).
+
+    python career_report.py [--college "IIT Bombay"] [--format csv|json] [--output report.csv]
+"""
+import argparse, csv, json, sys
+
+import numpy as np
+
+from app import app, db, User, Skill, UserSkillVector, career_requirements
+
+SKILL_CAP = 50
+MISSING_BELOW = 10
+
+
+def bulk_career_alignment(college=None):
+    """{user_id: {'username', 'college', 'careers': [{'name', 'match', 'missing'}, ...]}}.
+
+    Career lists are sorted by match, best first, exactly like get_career_alignment.
+    """
+    user_query = db.session.query(User.id, User.username, User.college).order_by(User.id)
+    if college:
+        user_query = user_query.filter(User.college == college)
+    users = user_query.all()
+    careers = career_requirements()
+    if not users:
+        return {}
+
+    # Column per skill name: everything any career asks for plus everything users have
+    columns = {}
+    for _, required in careers:
+        for name in required:
+            columns.setdefault(name, len(columns))
+    for (name,) in db.session.query(Skill.name).order_by(Skill.id):
+        columns.setdefault(name, len(columns))
+
+    row_of = {user_id: i for i, (user_id, _, _) in enumerate(users)}
+    points = np.zeros((len(users), len(columns)))
+    vector_query = (db.session.query(UserSkillVector.user_id, Skill.name, UserSkillVector.points)
+                    .join(Skill, Skill.id == UserSkillVector.skill_id))
+    if college:
+        vector_query = vector_query.join(User, User.id == UserSkillVector.user_id).filter(User.college == college)
+    for user_id, name, value in vector_query:
+        points[row_of[user_id], columns[name]] += value
+
+    # Requirement counts (a skill listed twice counts twice, as in the per-user loop)
+    required_cols = [np.array([columns[name] for name in required], dtype=int) for _, required in careers]
+    requirements = np.zeros((len(careers), len(columns)))
+    for c, cols in enumerate(required_cols):
+        np.add.at(requirements[c], cols, 1)
+
+    matched = np.minimum(points, SKILL_CAP) @ requirements.T            # users x careers
+    possible = requirements.sum(axis=1) * SKILL_CAP
+    match = (matched / possible * 100).astype(int)
+    weak = points < MISSING_BELOW                                       # users x skills
+
+    # Missing skills straight from the mask: nonzero() gives (user row, requirement)
+    # pairs in row order, split into one name array per user
+    boundaries = np.arange(1, len(users))
+    missing = []
+    for c, (_, required) in enumerate(careers):
+        rows, picks = np.nonzero(weak[:, required_cols[c]])             # users x len(required)
+        names = np.array(required, dtype=object)[picks]
+        missing.append(np.split(names, np.searchsorted(rows, boundaries)))
+
+    report = {}
+    for i, (user_id, username, user_college) in enumerate(users):
+        report[user_id] = {'username': username, 'college': user_college, 'careers': [
+            {'name': career_name, 'match': int(match[i, c]), 'missing': missing[c][i].tolist()}
+            for c, (career_name, _) in enumerate(careers)
+        ]}
+    for entry in report.values():
+        entry['careers'].sort(key=lambda x: x['match'], reverse=True)
+    return report
+
+
+def write_csv(report, out):
+    writer = csv.writer(out)
+    writer.writerow(['user_id', 'username', 'college', 'career', 'match', 'missing'])
+    for user_id, entry in report.items():
+        for career in entry['careers']:
+            writer.writerow([user_id, entry['username'], entry['college'] or '', career['name'],
+                             career['match'], '; '.join(career['missing'])])
+
+
+def write_json(report, out):
+    json.dump([{'user_id': user_id, **entry} for user_id, entry in report.items()], out, indent=2)
+    out.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--college', help='only users from this college')
+    parser.add_argument('--format', choices=('csv', 'json'), default='csv')
+    parser.add_argument('--output', help='file to write (default: stdout)')
+    args = parser.parse_args()
+
+    with app.app_context():
+        report = bulk_career_alignment(args.college)
+
+    writer = write_csv if args.format == 'csv' else write_json
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as out:
+            writer(report, out)
+        print(f"✅ Career alignment for {len(report)} users written to {args.output}", file=sys.stderr)
+    else:
+        writer(report, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,4 @@
-from app import app, db, Club, Event, Feedback, UserClub, Message, EventRegistration, ClubSkill
+from app import app, db, Club, Event, Feedback, UserClub, Message, EventRegistration, ClubSkill, ClubSimilarity
 
 def clean_database():
     with app.app_context():
@@ -21,6 +21,9 @@ def clean_database():
             print("Deleting Club Memberships...")
             UserClub.query.delete()
             
+            print("Deleting Club Similarities...")
+            ClubSimilarity.query.delete()
+            
             print("Deleting Events...")
             Event.query.delete()
             
@@ -0,0 +1,26 @@
+"""Compact old daily sentiment buckets into weekly ones (schedule nightly).
+
+    python compact_sentiment_buckets.py                # compact day buckets older than 90 days
+    python compact_sentiment_buckets.py --rebuild      # rebuild every bucket from Feedback first (one-off backfill)
+"""
+import argparse
+
+from app import app, db, compact_sentiment_buckets, rebuild_sentiment_buckets, SENTIMENT_KEEP_DAILY_DAYS
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rebuild', action='store_true', help='recompute all buckets from the feedback table')
+    parser.add_argument('--keep-days', type=int, default=SENTIMENT_KEEP_DAILY_DAYS,
+                        help='keep daily resolution for this many days')
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        if args.rebuild:
+            print("📈 Rebuilding sentiment buckets from feedback...")
+            rebuild_sentiment_buckets(args.keep_days)
+        else:
+            days, weeks = compact_sentiment_buckets(args.keep_days)
+            print(f"🗜️ Compacted {days} daily buckets into {weeks} weekly ones.")
+        db.session.commit()
+        print("✅ Sentiment buckets up to date.")
@@ -0,0 +1,40 @@
+"""Render every student's portfolio PDF for a college (or everyone) on a process pool.
+
+PDFs land in the portfolio cache (instance/portfolios) and are only
+re-rendered when their content changed; --output also copies them out as
+<username>_Portfolio.pdf, --zip streams them into a single archive as they
+are rendered ("-" writes the zip to stdout, e.g. to pipe it elsewhere).
+
+    python export_portfolios.py --college "IIT Bombay" [--processes 4] [--output exports/]
+    python export_portfolios.py --college "IIT Bombay" --zip iitb_portfolios.zip
+"""
+import argparse, os, shutil, sys
+
+from app import app, User, build_portfolios, write_portfolio_zip, portfolio_filenames
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--college', help='only students from this college')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (default: CPU count)')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--output', help='directory to copy the PDFs into')
+    group.add_argument('--zip', help='zip file to write the PDFs into ("-" for stdout)')
+    args = parser.parse_args()
+
+    with app.app_context():
+        query = User.query.order_by(User.id)
+        if args.college:
+            query = query.filter(User.college == args.college)
+        users = query.all()
+        print(f"📄 Building portfolios for {len(users)} students...", file=sys.stderr)
+        if args.zip:
+            target = sys.stdout.buffer if args.zip == '-' else args.zip
+            count = write_portfolio_zip(users, target, args.processes)
+            print(f"✅ {count} portfolios zipped into {'stdout' if args.zip == '-' else args.zip}.", file=sys.stderr)
+        else:
+            paths = build_portfolios(users, args.processes)
+            if args.output:
+                os.makedirs(args.output, exist_ok=True)
+                for user_id, name in portfolio_filenames(users).items():
+                    shutil.copyfile(paths[user_id], os.path.join(args.output, name))
+            print(f"✅ {len(paths)} portfolios ready{' in ' + args.output if args.output else ''}.")
@@ -1,10 +1,87 @@
 import sqlite3
 
-def migrate():
+# (index name, table, columns, unique) – must match the __table_args__ / index=True
+# declarations on the models in app.py
+INDEXES = [
+    ('uq_user_club_user_club', 'user_club', ('user_id', 'club_id'), True),
+    ('ix_user_club_club_status', 'user_club', ('club_id', 'status'), False),
+    ('uq_event_registration_user_event', 'event_registration', ('user_id', 'event_id'), True),
+    ('ix_event_registration_event_id', 'event_registration', ('event_id',), False),
+    ('ix_message_club_timestamp', 'message', ('club_id', 'timestamp'), False),
+    ('ix_message_club_id', 'message', ('club_id', 'id'), False),
+    ('ix_message_club_pinned', 'message', ('club_id', 'is_pinned'), False),
+    ('ix_feedback_user_id', 'feedback', ('user_id',), False),
+    ('ix_feedback_club_id', 'feedback', ('club_id',), False),
+    ('ix_feedback_club_timestamp', 'feedback', ('club_id', 'timestamp'), False),
+    ('ix_event_event_date', 'event', ('event_date',), False),
+    ('uq_user_badge_user_badge', 'user_badge', ('user_id', 'badge_name'), True),
+    ('ix_user_badge_badge_name', 'user_badge', ('badge_name',), False),
+    ('ix_user_badge_awarded_at', 'user_badge', ('awarded_at',), False),
+]
+
+
+# Which row survives when duplicates block a unique index (first in this order wins)
+KEEP_ORDER = {
+    'user_club': "CASE WHEN status = 'approved' THEN 0 ELSE 1 END, id DESC",
+    'event_registration': "registered_at DESC, id DESC",
+    'user_badge': "awarded_at, id",
+}
+
+
+def backfill_user_badges(conn):
+    """Create user_badge and copy badges out of the legacy user.badges CSV column."""
+    cursor = conn.cursor()
+    cursor.execute("""CREATE TABLE IF NOT EXISTS user_badge (
+        id INTEGER NOT NULL PRIMARY KEY,
+        user_id INTEGER NOT NULL REFERENCES user (id),
+        badge_name VARCHAR(50) NOT NULL,
+        awarded_at DATETIME NOT NULL
+    )""")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_user_badge_user_badge ON user_badge (user_id, badge_name)")
+    for user_id, badges, last_active in cursor.execute("SELECT id, badges, last_active FROM user").fetchall():
+        for name in dict.fromkeys(b.strip() for b in (badges or '').split(',') if b.strip()):
+            conn.execute("INSERT OR IGNORE INTO user_badge (user_id, badge_name, awarded_at) "
+                         "VALUES (?, ?, COALESCE(?, CURRENT_TIMESTAMP))", (user_id, name, last_active))
+    conn.commit()
+    print(f"user_badge back-filled ({cursor.execute('SELECT COUNT(*) FROM user_badge').fetchone()[0]} rows).")
+
+
+def remove_duplicates(conn, table, cols):
+    """A unique index can't be built over duplicate rows: keep the preferred row per
+    key (KEEP_ORDER, e.g. the approved membership) and list every row removed."""
+    ranked = (f"SELECT id, {cols}, ROW_NUMBER() OVER (PARTITION BY {cols} "
+              f"ORDER BY {KEEP_ORDER.get(table, 'id DESC')}) AS rank FROM {table}")
+    doomed = conn.execute(f"SELECT * FROM {table} WHERE id IN (SELECT id FROM ({ranked}) WHERE rank > 1)").fetchall()
+    if not doomed:
+        return
+    print(f"Removing {len(doomed)} duplicate rows from {table} ({cols}):")
+    for row in doomed:
+        print(f"  {row}")
+    conn.execute(f"DELETE FROM {table} WHERE id IN (SELECT id FROM ({ranked}) WHERE rank > 1)")
+    conn.commit()
+
+
+def create_indexes(conn):
+    cursor = conn.cursor()
+    for name, table, columns, unique in INDEXES:
+        cols = ', '.join(columns)
+        if unique:
+            remove_duplicates(conn, table, cols)
+        try:
+            cursor.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({cols})")
+            conn.commit()
+        except sqlite3.OperationalError as e:
+            print(f"Error creating index {name}: {e}")
+    cursor.execute("ANALYZE")
+    conn.commit()
+    print("Indexes up to date.")
+
+
+def migrate(db_path='instance/site.db'):
     print("Checking database schema...")
-    conn = sqlite3.connect('instance/site.db')
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
-    
+
     # helper to add column if it doesn't exist
     def add_column(table, column, definition):
         try:
@@ -31,7 +108,16 @@ def migrate():
 
     # 4. event_registration
     add_column('event_registration', 'transaction_id', 'VARCHAR(100)')
-    
+
+    # 5. feedback scoring claims (SentimentWorker)
+    add_column('feedback', 'claimed_at', 'DATETIME')
+
+    # 6. badges: CSV column -> user_badge table
+    backfill_user_badges(conn)
+
+    # 7. indexes & unique constraints on hot lookup columns
+    create_indexes(conn)
+
     conn.close()
 
 if __name__ == '__main__':
@@ -0,0 +1,16 @@
+from app import app, db, rebuild_skill_vectors, UserSkillVector
+
+def nightly_skill_refresh():
+    """Rebuild every user's skill vector so events that have since ended start counting.
+
+    Schedule once a day (cron / Task Scheduler); also run it once after upgrading
+    to fill the user_skill_vector table for existing users.
+    """
+    with app.app_context():
+        db.create_all()
+        rebuild_skill_vectors()
+        db.session.commit()
+        print(f"✅ Skill vectors rebuilt ({UserSkillVector.query.count()} rows).")
+
+if __name__ == "__main__":
+    nightly_skill_refresh()
@@ -0,0 +1,80 @@
+"""Portfolio PDF layout.
+
+Rendering works from a plain dict (see app.portfolio_data) so it can run in
+worker processes without touching the database.
+"""
+import hashlib, json
+
+from fpdf import FPDF
+
+# Bump when the layout changes so cached PDFs get regenerated
+LAYOUT_VERSION = 1
+
+
+class PDF(FPDF):
+    def header(self):
+        self.set_font('Arial', 'B', 15)
+        self.cell(80)
+        self.cell(30, 10, 'CampusConnect Impact Report', 0, 0, 'C')
+        self.ln(20)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('Arial', 'I', 8)
+        self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'C')
+
+
+def latin1(text):
+    """The core PDF fonts are latin-1 only; drop what they can't draw (badge emoji etc.)."""
+    return str(text).encode('latin-1', 'ignore').decode('latin-1').strip()
+
+
+def fingerprint(data):
+    """Stable hash of everything that ends up in the PDF."""
+    payload = json.dumps([LAYOUT_VERSION, data], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:20]
+
+
+def render_portfolio(data):
+    """PDF bytes for one student's portfolio data."""
+    pdf = PDF()
+    pdf.add_page()
+
+    # Title & User Info
+    pdf.set_font("Arial", size=12)
+    pdf.cell(200, 10, txt=latin1(f"Student Profile: {data['username']}"), ln=True)
+    pdf.cell(200, 10, txt=latin1(f"Email: {data['email']}"), ln=True)
+    pdf.cell(200, 10, txt=latin1(f"College: {data['college'] or 'N/A'}"), ln=True)
+    pdf.cell(200, 10, txt=latin1(f"Level: {data['level']} ({data['level_name']})"), ln=True)
+    pdf.ln(10)
+
+    # Skills
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(200, 10, txt="Skill Profile", ln=True)
+    pdf.set_font("Arial", size=12)
+    if data['skills']:
+        for name, pts in data['skills']:
+            pdf.cell(200, 8, txt=latin1(f"- {name}: {pts} Points"), ln=True)
+    else:
+        pdf.cell(200, 8, txt="No skills detected yet.", ln=True)
+    pdf.ln(10)
+
+    # Badges
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(200, 10, txt="Achievements & Badges", ln=True)
+    pdf.set_font("Arial", size=12)
+    if data['badges']:
+        for name, rarity in data['badges']:
+            pdf.cell(200, 8, txt=latin1(f"- {name} ({rarity})"), ln=True)
+    else:
+        pdf.cell(200, 8, txt="No badges earned yet.", ln=True)
+    pdf.ln(10)
+
+    # Club Participation
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(200, 10, txt="Club Memberships", ln=True)
+    pdf.set_font("Arial", size=12)
+    for name, category in data['clubs']:
+        pdf.cell(200, 8, txt=latin1(f"- {name} ({category})"), ln=True)
+
+    return pdf.output(dest='S').encode('latin-1')
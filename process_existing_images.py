@@ -0,0 +1,38 @@
+from app import app, db, Club, User, image_pipeline, InvalidImage, IMAGE_DEFAULTS, PROCESSED_IMAGE_DIR
+import os
+
+def process_existing_images():
+    """Run club logos / profile pictures uploaded before the image pipeline through it.
+
+    Each file is re-encoded (EXIF-oriented, metadata stripped, thumbnails
+    generated) under its content-hashed name and the row is pointed at it.
+    The original file is left in place.
+    """
+    with app.app_context():
+        done = skipped = 0
+        for kind, rows, column in (('club', Club.query.all(), 'image_file'),
+                                   ('profile', User.query.all(), 'profile_image')):
+            for row in rows:
+                current = getattr(row, column)
+                if not current or current == IMAGE_DEFAULTS[kind] or current.startswith(PROCESSED_IMAGE_DIR + '/'):
+                    continue
+                path = os.path.join(image_pipeline.folder(kind), current)
+                if not os.path.exists(path):
+                    skipped += 1
+                    continue
+                with open(path, 'rb') as f:
+                    data = f.read()
+                try:
+                    filename = image_pipeline.validate(data)
+                except InvalidImage as e:
+                    print(f"⚠️ {kind} image {current}: {e}")
+                    skipped += 1
+                    continue
+                image_pipeline.process(data, kind, filename)
+                setattr(row, column, filename)
+                done += 1
+        db.session.commit()
+        print(f"✅ Processed {done} images ({skipped} skipped).")
+
+if __name__ == "__main__":
+    process_existing_images()
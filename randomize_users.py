@@ -17,7 +17,7 @@ def randomize_users():
             # 2. Random Badges (0 to 5 badges)
             num_badges = random.randint(0, 5)
             user_badges = random.sample(all_badges, num_badges)
-            user.badges = ",".join(user_badges)
+            user.set_badges(user_badges)
             
             # 3. Random Streak (0 to 30 days)
             user.streak_count = random.randint(0, 30)
@@ -1,4 +1,4 @@
-from app import app, db, User, UserSkill, UserClub, Feedback, EventRegistration, Message, Club, Event
+from app import app, db, User, UserSkill, UserClub, Feedback, EventRegistration, Message, Club, Event, UserBadge, XPEvent, XPDailyTotal, UserActivityDay
 from flask_bcrypt import Bcrypt
 import random
 from datetime import datetime, timedelta
@@ -16,6 +16,10 @@ def repopulate_users():
         db.session.query(Feedback).delete()
         db.session.query(EventRegistration).delete()
         db.session.query(Message).delete()
+        db.session.query(UserBadge).delete()
+        db.session.query(XPEvent).delete()
+        db.session.query(XPDailyTotal).delete()
+        db.session.query(UserActivityDay).delete()
         
         # Note: If users manage clubs or created events, those might be affected.
         # The user's previous request was to delete all clubs/events, so those should be 0.
@@ -54,10 +58,10 @@ def repopulate_users():
                 password=hashed_password,
                 college=college,
                 xp=xp,
-                badges=badges,
                 streak_count=random.randint(0, 10),
                 last_active=datetime.utcnow() - timedelta(days=random.randint(0, 5))
             )
+            user.set_badges(badges.split(','))
             db.session.add(user)
         
         db.session.commit()
@@ -0,0 +1,46 @@
+"""Rescore feedback sentiment in bulk using several processes.
+
+    python rescore_feedback.py                  # rows still pending
+    python rescore_feedback.py --all            # every row, e.g. after changing the analyzer
+    python rescore_feedback.py --processes 8 --chunk-size 200
+"""
+import argparse, os
+from multiprocessing import Pool
+
+from app import app, db, Feedback, SENTIMENT_PENDING, analyze_sentiment, apply_sentiment_scores
+from sentiment import sentiment_service
+
+
+def _score_chunk(rows):
+    return {fid: analyze_sentiment(content) for fid, content in rows}
+
+
+def rescore_feedback(rescore_all=False, processes=None, chunk_size=100):
+    with app.app_context():
+        query = db.session.query(Feedback.id, Feedback.content).order_by(Feedback.id)
+        if not rescore_all:
+            query = query.filter(Feedback.sentiment_label == SENTIMENT_PENDING)
+        rows = [tuple(row) for row in query]
+        if not rows:
+            print("✅ Nothing to rescore.")
+            return 0
+        chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+        print(f"🧠 Scoring {len(rows)} feedback rows in {len(chunks)} chunks on {processes or os.cpu_count()} processes...")
+        done = 0
+        with Pool(processes, initializer=sentiment_service.warm) as pool:
+            for scores in pool.imap_unordered(_score_chunk, chunks):
+                apply_sentiment_scores(scores)
+                db.session.commit()
+                done += len(scores)
+                print(f"   {done}/{len(rows)}")
+        print(f"✅ Rescored {done} feedback rows.")
+        return done
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--all', action='store_true', help='rescore every row, not just pending ones')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=100)
+    args = parser.parse_args()
+    rescore_feedback(args.all, args.processes, args.chunk_size)
@@ -34,10 +34,10 @@ def seed_database():
                 password=hashed_password,
                 college=college,
                 xp=xp,
-                badges=badges,
                 streak_count=random.randint(0, 15),
                 last_active=datetime.utcnow() - timedelta(days=random.randint(0, 5))
             )
+            user.set_badges(badges.split(','))
             db.session.add(user)
 
         db.session.commit()
@@ -0,0 +1,161 @@
+"""Feedback sentiment scoring service.
+
+One process-wide SentimentService wraps a backend, warms it once (at start-up
+or in a pre-fork hook) and memoizes scores per feedback text in an LRU. The text
+is scored exactly as written: case and spacing can change the polarity
+("Meh :-D" vs "meh :-d"), so they're part of the cache key too.
+
+Backends:
+    textblob  – TextBlob's PatternAnalyzer (default, what feedback was always scored with)
+    lexicon   – pure-Python scorer over the same polarity lexicon TextBlob ships,
+                no tokenizer/tagger pipeline; much faster, close but not
+                identical scores (see bench_sentiment.py)
+
+Pick one with the SENTIMENT_BACKEND environment variable.
+"""
+import os, re, threading
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+
+POSITIVE_THRESHOLD = 0.1
+NEGATIVE_THRESHOLD = -0.1
+
+
+def label_for(score):
+    if score > POSITIVE_THRESHOLD:
+        return "Positive"
+    if score < NEGATIVE_THRESHOLD:
+        return "Negative"
+    return "Neutral"
+
+
+class TextBlobBackend:
+    name = 'textblob'
+
+    def __init__(self):
+        self._blob = None
+
+    def warm(self):
+        if self._blob is None:
+            from textblob import TextBlob
+            TextBlob("warm up the analyzer").sentiment   # loads the lexicon
+            self._blob = TextBlob
+
+    def polarity(self, text):
+        self.warm()
+        return self._blob(text).sentiment.polarity
+
+
+class LexiconBackend:
+    """Pattern's assessment loop (modifiers, negation, "!" and emoticons) over
+    the en-sentiment.xml lexicon, minus the tokenizer/tagger machinery."""
+    name = 'lexicon'
+
+    NEGATIONS = {'no', 'not', "n't", 'never'}
+    EMOTICONS = {
+        '<3': 1.0, ':-d': 1.0, ':d': 1.0, 'xd': 1.0, ':-p': 0.75, ':p': 0.75,
+        ':-)': 0.5, ':)': 0.5, '=)': 0.5, ';-)': 0.25, ';)': 0.25,
+        ':-/': -0.25, ':/': -0.25, ':-(': -0.75, ':(': -0.75, '=(': -0.75, ":'(": -1.0,
+    }
+    TOKEN_RE = re.compile('|'.join(re.escape(e) for e in sorted(EMOTICONS, key=len, reverse=True))
+                          + r"|n't|[a-z0-9]+(?:'[a-z]+)?|!")
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lexicon = None
+        self._modifiers = None
+        self._lock = threading.Lock()
+
+    def _lexicon_path(self):
+        if self.path:
+            return self.path
+        import textblob
+        return os.path.join(os.path.dirname(textblob.__file__), 'en', 'en-sentiment.xml')
+
+    def warm(self):
+        with self._lock:
+            if self._lexicon is not None:
+                return
+            senses, modifiers = {}, set()
+            for word in ET.parse(self._lexicon_path()).getroot().iter('word'):
+                form = word.get('form', '').lower()
+                if not form:
+                    continue
+                senses.setdefault(form, []).append(
+                    (float(word.get('polarity', 0)), float(word.get('intensity', 1))))
+                if word.get('pos') == 'RB':
+                    modifiers.add(form)
+            # Average over word senses, like pattern does without a POS tag
+            self._lexicon = {w: (sum(p for p, _ in s) / len(s), sum(i for _, i in s) / len(s))
+                             for w, s in senses.items()}
+            self._modifiers = modifiers
+
+    def polarity(self, text):
+        if self._lexicon is None:
+            self.warm()
+        lexicon = self._lexicon
+        assessments = []          # [polarity, intensity, negated]
+        modifier = negation = None
+        for w in self.TOKEN_RE.findall(text.lower()):
+            if w in lexicon:
+                p, i = lexicon[w]
+                if modifier is None:                       # "good"
+                    assessments.append([p, i, False])
+                else:                                      # "really good"
+                    last = assessments[-1]
+                    last[0] = max(-1.0, min(p * last[1], 1.0))
+                    last[1] = i
+                if negation is not None:                   # "not really good"
+                    assessments[-1][1] = 1.0 / assessments[-1][1]
+                    assessments[-1][2] = True
+                modifier = w if w in self._modifiers else None
+                negation = w if w in self.NEGATIONS else None
+            else:
+                if w in self.NEGATIONS:
+                    negation = w
+                elif negation and len(w.strip("'")) > 1:
+                    negation = None
+                if negation is not None and modifier is not None:   # "really not good"
+                    assessments[-1][2] = True
+                    negation = None
+                elif modifier and len(w) > 2:
+                    modifier = None
+                if w == '!' and assessments:
+                    assessments[-1][0] = max(-1.0, min(assessments[-1][0] * 1.25, 1.0))
+                if w in self.EMOTICONS:
+                    assessments.append([self.EMOTICONS[w], 1.0, False])
+        if not assessments:
+            return 0.0
+        # "not good" = slightly bad, "not bad" = slightly good
+        return sum(p * -0.5 if negated else p for p, _, negated in assessments) / len(assessments)
+
+
+BACKENDS = {backend.name: backend for backend in (TextBlobBackend, LexiconBackend)}
+
+
+class SentimentService:
+    """Backend + LRU of text -> (polarity, label)."""
+
+    def __init__(self, backend='textblob', cache_size=4096):
+        self.backend = BACKENDS[backend]() if isinstance(backend, str) else backend
+        self._score = lru_cache(maxsize=cache_size)(self._score_text)
+
+    def warm(self):
+        self.backend.warm()
+
+    def _score_text(self, text):
+        score = self.backend.polarity(text)
+        return score, label_for(score)
+
+    def score(self, content):
+        """(polarity, label) for a piece of feedback text."""
+        return self._score(content)
+
+    def cache_info(self):
+        return self._score.cache_info()
+
+    def cache_clear(self):
+        self._score.cache_clear()
+
+
+sentiment_service = SentimentService(os.environ.get('SENTIMENT_BACKEND', 'textblob'))
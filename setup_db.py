@@ -13,10 +13,11 @@ with app.app_context():
     # Create Test Users with XP (Only if they don't exist)
     pw = bcrypt_obj.generate_password_hash('password').decode('utf-8')
 
-    def get_or_create_user(username, email, **kwargs):
+    def get_or_create_user(username, email, badges='', **kwargs):
         user = User.query.filter_by(email=email).first()
         if not user:
             user = User(username=username, email=email, password=pw, **kwargs)
+            user.set_badges(badges.split(','))
             db.session.add(user)
             db.session.commit()
             print(f"User {username} created.")